@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark the one-pass description locator against the original nested div scan
+
+The original fallback called get_text(strip=True) on every <div>, which re-reads the
+text of nested divs once per ancestor. Times, from an already parsed page:
+  scan     the original scan over the soup
+  soup     locate_description_soup, what the bs4 backend runs
+  lxml     locate_description on the lxml tree, what the lxml backend runs
+  +parse   lxml plus building the lxml tree, what the bs4 backend paid before it had
+           a soup locator
+
+Runs over the given pages, or else the detail pages in benchmarks/fixtures (synthetic)
+and the listing pages in the page cache (.http_cache, real pages from earlier runs).
+
+Usage: python benchmarks/bench_description.py [repeat] [page.html ...]
+"""
+
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import lxml_extract
+from parsed_page import ParsedPage
+
+
+def legacy_scan(page):
+    for div in page.soup.find_all('div'):
+        text = div.get_text(strip=True)
+        if len(text) > 100 and not any(skip in text.lower() for skip in ['telefon', 'email', 'contact']):
+            return text
+    return ""
+
+
+def soup_locator(page):
+    div = lxml_extract.locate_description_soup(page.soup)
+    return div.get_text(strip=True) if div is not None else ""
+
+
+def locator(page):
+    div = lxml_extract.locate_description(page.tree)
+    return lxml_extract.get_text(div, strip=True) if div is not None else ""
+
+
+def parse_and_locate(page):
+    return locator(ParsedPage(page.html))
+
+
+def load_pages(paths):
+    if not paths:
+        paths = sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'fixtures', 'detail_*.html')))
+        paths += sorted(glob.glob(os.path.join(ROOT, '.http_cache', 'listing-*.html')))
+    pages = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            page = ParsedPage(f.read())
+        page.soup, page.tree  # Parse up front, outside the timed loops
+        pages.append((os.path.basename(path), page))
+    return pages
+
+
+def timed(function, page, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function(page)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = load_pages(sys.argv[2:])
+    print(f"Detail pages: {len(pages)}, {repeat} repeats (times in ms)\n")
+    print(f"{'page':36} {'divs':>6} {'scan':>8} {'soup':>8} {'lxml':>8} {'+parse':>8}  chosen block")
+
+    totals = [0, 0, 0, 0]
+    for name, page in pages:
+        scan_time, scan_text = timed(legacy_scan, page, repeat)
+        soup_time, soup_text = timed(soup_locator, page, repeat)
+        lxml_time, lxml_text = timed(locator, page, repeat)
+        parse_time, _ = timed(parse_and_locate, page, repeat)
+        for i, elapsed in enumerate((scan_time, soup_time, lxml_time, parse_time)):
+            totals[i] += elapsed
+        same = 'same' if scan_text == soup_text == lxml_text else (
+            f'{len(scan_text)} -> {len(soup_text)} (soup), {len(lxml_text)} (lxml) chars'
+        )
+        print(f"{name[:36]:36} {len(page.tree.xpath('//div')):6d} {scan_time * 1000:8.2f} {soup_time * 1000:8.2f} "
+              f"{lxml_time * 1000:8.2f} {parse_time * 1000:8.2f}  {same}")
+
+    scan, soup, lxml, parse = totals
+    print(f"\nTotal: scan {scan * 1000:.2f}, soup {soup * 1000:.2f} ({scan / soup:.1f}x faster), "
+          f"lxml {lxml * 1000:.2f} ({scan / lxml:.1f}x), lxml with its parse {parse * 1000:.2f} ({scan / parse:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Memory per listing: plain dicts against Listing records
+
+Builds `count` listings from the synthetic search pages in benchmarks/fixtures (repeated, with distinct IDs)
+both ways and reports the Python heap each set takes (tracemalloc), plus the time
+to build them and to derive ID, numeric price and model for each.
+
+Usage: python benchmarks/bench_listing_memory.py [count]
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from olx_scraper import OLXScraper
+from listing import Listing, get_listing_id, identify_model, price_value
+
+SEARCH_URL = 'https://www.olx.ro/electronice-si-electrocasnice/jocuri-console/q-console-defecte/'
+
+
+def sample_rows():
+    """The listings of every fixture search page, as dicts"""
+    scraper = OLXScraper()
+    rows = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'fixtures', 'search_*.html'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                listings, _ = scraper.parse_search_page(f.read(), SEARCH_URL)
+            rows.extend(listing.to_dict() for listing in listings)
+    return rows
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rows = sample_rows()
+    # Fresh strings per listing, as a crawl produces them (only the location repeats)
+    source = [
+        {**row, 'link': row['link'].replace('.html', f'{i}.html'), 'title': row['title'] + ' ',
+         'price': row['price'] + '', 'location': ''.join(row['location'])}
+        for i, row in ((i, rows[i % len(rows)]) for i in range(count))
+    ]
+
+    def dicts():
+        # What every stage used to derive from each dict, kept alongside it
+        return [dict(row, listing_id=get_listing_id(row['link']), price_value=price_value(row['price']),
+                     model=identify_model(row['title'])) for row in source]
+
+    def records():
+        return [Listing.from_dict(row) for row in source]
+
+    _, dict_size, dict_time = measure(dicts)
+    _, record_size, record_time = measure(records)
+    print(f"{count} listings")
+    print(f"  dicts:    {dict_size / count:7.0f} bytes/listing  {dict_time:.2f}s")
+    print(f"  Listing:  {record_size / count:7.0f} bytes/listing  {record_time:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
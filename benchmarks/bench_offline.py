@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark of the scraper, the filter and the parsers against a local OLX stand-in
+
+Starts benchmarks/olx_standin.py in a subprocess (so its work is not counted), then runs:
+  parsers  every fixture search/detail page through each extraction path
+  scrape   OLXScraper.scrape_search over the stand-in's paginated search
+  filter   OLXDefectFilter.filter_listings over the scraped listings (fetching their pages)
+
+For each stage it reports wall time, CPU time, pages/sec, peak memory (process RSS
+high-water mark, plus the stage's Python heap peak from tracemalloc for the parsers or
+with --trace-memory) and the requests, connections and (compressed) bytes the stand-in
+served, and writes everything to a JSON file. With
+--compare, the relative change of each metric against an earlier results file is printed.
+
+Usage: python benchmarks/bench_offline.py [--pages 5] [--latency 0.02 0.1] [--throttle-every 40]
+                                          [--output results.json] [--compare previous.json]
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.request import urlopen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from olx_scraper import OLXScraper
+from filter_defect_listings import OLXDefectFilter
+from parsed_page import ParsedPage
+from parse_workers import ParserPool
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+SEARCH_PATH = '/electronice-si-electrocasnice/jocuri-console/q-console-defecte/'
+
+
+@contextlib.contextmanager
+def standin_server(args):
+    """Run the stand-in in a subprocess and yield its base URL"""
+    command = [sys.executable, os.path.join(ROOT, 'benchmarks', 'olx_standin.py'), '--port', '0',
+               '--pages', str(args.pages), '--latency', str(args.latency[0]), str(args.latency[1]),
+               '--throttle-every', str(args.throttle_every), '--tolerated-rate', str(args.tolerated_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    try:
+        yield process.stdout.readline().split()[-1]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def server_call(base, path):
+    with urlopen(base + path) as response:
+        return json.loads(response.read())
+
+
+def peak_rss_kb():
+    """High-water mark of the process's resident memory so far, in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(function, base=None, trace_memory=False):
+    """Run a stage quietly; return (result, metrics) with wall/CPU time, memory and served requests
+
+    tracemalloc (the Python heap peak of this stage alone) slows allocation-heavy code
+    down severalfold, so it is only used when asked for; the process RSS high-water
+    mark is always recorded.
+    """
+    if base:
+        server_call(base, '/__reset')
+    if trace_memory:
+        tracemalloc.start()
+    wall, cpu = time.perf_counter(), time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = function()
+    metrics = {
+        'wall_seconds': round(time.perf_counter() - wall, 4),
+        'cpu_seconds': round(time.process_time() - cpu, 4),
+        'peak_rss_kb': peak_rss_kb()
+    }
+    if trace_memory:
+        metrics['peak_heap_kb'] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+    if base:
+        metrics['server'] = server_call(base, '/__stats')
+    return result, metrics
+
+
+def bench_parsers(repeat):
+    """Time every extraction path on every fixture page"""
+    url = 'https://www.olx.ro' + SEARCH_PATH
+    variants = {
+        'search_embedded': (OLXScraper(), True),
+        'search_bs4': (OLXScraper(structured_data=False), True),
+        'search_lxml': (OLXScraper(structured_data=False, parser_backend='lxml'), True),
+        'detail_bs4': (OLXDefectFilter(), False),
+        'detail_lxml': (OLXDefectFilter(parser_backend='lxml'), False)
+    }
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+
+    results = {}
+    for name, (parser, is_search) in variants.items():
+        selected = [html for page, html in pages.items() if page.startswith('search_' if is_search else 'detail_')]
+
+        def run(passes):
+            for _ in range(passes):
+                for html in selected:
+                    if is_search:
+                        parser.parse_search_page(ParsedPage(html, url), url)
+                    else:
+                        parser.parse_detail_page(ParsedPage(html, url), url)
+
+        _, metrics = measure(lambda: run(repeat))
+        # One extra traced pass for the heap peak, so tracemalloc does not skew the timings
+        _, traced = measure(lambda: run(1), trace_memory=True)
+        metrics['peak_heap_kb'] = traced['peak_heap_kb']
+        parsed = repeat * len(selected)
+        metrics['pages'] = parsed
+        metrics['pages_per_second'] = round(parsed / metrics['wall_seconds'], 1)
+        results[name] = metrics
+    return results
+
+
+def bench_scrape(base, args, parser_pool):
+    scraper = OLXScraper(max_concurrency=args.concurrency, requests_per_second=args.rate, parser_pool=parser_pool)
+    listings, metrics = measure(lambda: scraper.scrape_search(base + SEARCH_PATH, max_pages=args.pages + 1), base,
+                                args.trace_memory)
+    served = metrics['server']['counts']
+    metrics['listings'] = len(listings)
+    metrics['pages'] = served.get('search_200', 0)
+    metrics['pages_per_second'] = round(metrics['pages'] / metrics['wall_seconds'], 2)
+    return scraper, listings, metrics
+
+
+def bench_filter(base, args, scraper, listings, directory, parser_pool):
+    input_file = os.path.join(directory, 'olx_listings.csv')
+    output_file = os.path.join(directory, 'olx_defect_only.csv')
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper.save_to_csv(listings, input_file)
+
+    defect_filter = OLXDefectFilter(requests_per_second=args.rate, parser_pool=parser_pool)
+    kept, metrics = measure(
+        lambda: defect_filter.filter_listings(input_file, output_file, workers=args.workers), base, args.trace_memory
+    )
+    served = metrics['server']['counts']
+    metrics['listings'] = len(listings)
+    metrics['kept'] = len(kept)
+    metrics['pages'] = served.get('detail_200', 0)
+    metrics['pages_per_second'] = round(metrics['pages'] / metrics['wall_seconds'], 2)
+    return metrics
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(metrics, prefix=''):
+    """{'scrape.wall_seconds': 1.2, ...} for every numeric metric"""
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(previous_file, stages):
+    with open(previous_file, 'r', encoding='utf-8') as f:
+        previous = flatten(json.load(f)['stages'])
+    current = flatten(stages)
+    print(f"\nChange against {previous_file}:")
+    for key, value in current.items():
+        if key in previous and previous[key]:
+            print(f"  {key:45} {previous[key]:>12} -> {value:>12}  ({(value - previous[key]) / previous[key]:+.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scraper, filter and parsers offline")
+    parser.add_argument('--pages', type=int, default=5, help="search result pages served (default: 5)")
+    parser.add_argument('--latency', type=float, nargs=2, default=[0.02, 0.1], metavar=('MIN', 'MAX'),
+                        help="stand-in response delay range in seconds (default: 0.02 0.1)")
+    parser.add_argument('--throttle-every', type=int, default=40, help="every Nth request gets a 429 (0: never)")
+    parser.add_argument('--tolerated-rate', type=float, default=0,
+                        help="stand-in answers requests beyond this many per second with 429 (default: no limit)")
+    parser.add_argument('--rate', type=float, default=20.0, help="client requests per second (default: 20)")
+    parser.add_argument('--concurrency', type=int, default=4, help="scraper requests in flight per host")
+    parser.add_argument('--workers', type=int, default=8, help="filter workers (default: 8)")
+    parser.add_argument('--parser-workers', type=int, default=0,
+                        help="parse in this many worker processes (default: 0, in the fetching threads)")
+    parser.add_argument('--repeat', type=int, default=10, help="passes over the fixtures in the parser stage")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="also record the Python heap peak of the scrape/filter stages (slows them down)")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/<time>-<revision>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    # Network stages first: the RSS high-water mark only ever grows
+    stages = {}
+    parser_pool = ParserPool(args.parser_workers) if args.parser_workers > 0 else None
+    with standin_server(args) as base, tempfile.TemporaryDirectory() as directory:
+        print(f"⏱️  Scrape ({base})...")
+        scraper, listings, stages['scrape'] = bench_scrape(base, args, parser_pool)
+        print("⏱️  Filter...")
+        # filter_listings reads excluded_listings.json from the working directory
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            stages['filter'] = bench_filter(base, args, scraper, listings, directory, parser_pool)
+        finally:
+            os.chdir(cwd)
+            if parser_pool:
+                parser_pool.close()
+    print("⏱️  Parsers...")
+    stages['parsers'] = bench_parsers(args.repeat)
+
+    revision = git_revision()
+    results = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': revision,
+        'python': platform.python_version(),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'stages': stages
+    }
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"{time.strftime('%Y%m%d-%H%M%S')}-{revision or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    for name, metrics in stages.items():
+        if name == 'parsers':
+            for variant, parser_metrics in metrics.items():
+                print(f"  parse {variant:16} {parser_metrics['pages_per_second']:>9} pages/s "
+                      f"cpu {parser_metrics['cpu_seconds']}s  heap {parser_metrics['peak_heap_kb']} KB")
+        else:
+            print(f"  {name:22} {metrics['pages_per_second']:>9} pages/s  wall {metrics['wall_seconds']}s  "
+                  f"cpu {metrics['cpu_seconds']}s  rss {metrics['peak_rss_kb']} KB  "
+                  f"requests {metrics['server']['counts']} over {metrics['server']['connections']} connections, "
+                  f"{metrics['server']['wire_bytes'] // 1024} KB on the wire")
+    print(f"💾 Saved results to {output}")
+
+    if args.compare:
+        compare(args.compare, stages)
+
+
+if __name__ == "__main__":
+    main()
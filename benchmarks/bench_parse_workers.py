@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Parsing throughput of parse_workers.ParserPool by number of worker processes
+
+Submits every (synthetic) page in benchmarks/fixtures `repeat` times (search pages to
+the scraper's parser, listing pages to the filter's page checks) from 16 threads,
+like the fetching threads do, and reports pages/sec for 1, 2, 4... workers up to
+the number of CPUs, next to parsing in the calling threads.
+
+Usage: python benchmarks/bench_parse_workers.py [repeat]
+"""
+
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from olx_scraper import OLXScraper
+from filter_defect_listings import OLXDefectFilter
+from parse_workers import ParserPool
+from run_metrics import RunMetrics
+
+SEARCH_URL = 'https://www.olx.ro/electronice-si-electrocasnice/jocuri-console/q-console-defecte/'
+LISTING_URL = 'https://www.olx.ro/d/oferta/consola-defecta-IDbench.html'
+TITLE = 'Consola PS4 defecta'
+
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'fixtures', '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((f.read(), os.path.basename(path).startswith('search_')))
+    return pages
+
+
+def run(pages, repeat, pool=None):
+    """Parse every page `repeat` times from 16 threads; returns the elapsed seconds"""
+    scraper = OLXScraper()
+    defect_filter = OLXDefectFilter()
+    metrics = RunMetrics()
+
+    def parse(page):
+        html, is_search = page
+        if is_search:
+            if pool:
+                return asyncio.run(pool.parse_search_page_async(html, SEARCH_URL, metrics))
+            return scraper.parse_search_page(html, SEARCH_URL)
+        if pool:
+            return pool.check_page(TITLE, LISTING_URL, '300 lei', html, metrics)
+        return defect_filter.check_page(TITLE, LISTING_URL, '300 lei', html)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(parse, pages * repeat))
+    return time.perf_counter() - start
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = load_pages()
+    total = len(pages) * repeat
+    print(f"{total} pages, {os.cpu_count()} CPUs")
+
+    elapsed = run(pages, repeat)
+    print(f"  in the calling threads: {total / elapsed:8.1f} pages/s")
+    workers = 1
+    while workers <= (os.cpu_count() or 1):
+        with ParserPool(workers) as pool:
+            run(pages, 1, pool)  # Start the workers and warm them up
+            elapsed = run(pages, repeat, pool)
+        print(f"  {workers:2} worker processes:   {total / elapsed:8.1f} pages/s")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Time PriceHistory.record_snapshot on large synthetic runs
+
+Creates a history in a temporary directory and records `runs` snapshots of `listings`
+listings each; every run a share of the listings changes price and some new ones
+appear. Reports the time per run (including loading and saving the files), the
+observations stored and the size of the files.
+
+Usage: python benchmarks/bench_price_history.py [listings] [runs]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from price_history import PriceHistory
+
+
+def main():
+    listings = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    rng = random.Random(0)
+    ids = [f"IDx{i:07d}" for i in range(listings)]
+    prices = [rng.randrange(100, 3000) for _ in ids]
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{listings} listings per run, {runs} runs")
+        for run in range(runs):
+            # 2% of the listings change price, 1% are replaced by new listings
+            for i in rng.sample(range(listings), listings // 50):
+                prices[i] = max(1, prices[i] + rng.choice((-50, -20, 20, 50)))
+            for i in rng.sample(range(listings), listings // 100):
+                ids[i] = f"IDn{run}x{i:07d}"
+            price_strings = [f"{price:,} lei".replace(',', '.') for price in prices]
+
+            start = time.perf_counter()
+            history = PriceHistory(directory)
+            summary = history.record_snapshot(ids, price_strings, 1700000000.0 + run * 3600)
+            history.save()
+            elapsed = time.perf_counter() - start
+            print(f"  run {run + 1:2}: {elapsed * 1000:8.1f} ms  {len(summary['new']):7} new  "
+                  f"{len(summary['drops']):6} drops  {len(summary['rises']):6} rises")
+
+        sizes = {name: os.path.getsize(os.path.join(directory, name)) for name in sorted(os.listdir(directory))}
+        print(f"Observations: {len(PriceHistory(directory).observations())}")
+        for name, size in sizes.items():
+            print(f"  {name:18} {size / 1024:10.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch rule evaluation (RuleSet.evaluate) against the per-listing checks
+
+Runs over the stored listings (olx_listings.json). The per-listing version applies
+the title, URL, model and price rules one call at a time, as check_listing did
+before fetching; the batch version evaluates every listing at once. Also reports
+how many listing page fetches the batch saves, with and without trusted prices.
+
+Usage: python benchmarks/bench_rules.py [repeat]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_defect_listings import OLXDefectFilter
+from listing import Listing
+
+
+def per_listing(defect_filter, listings):
+    reasons = []
+    for listing in listings:
+        title_matches = defect_filter.rule_matcher().match(listing.title)
+        if defect_filter.has_forbidden_phrase(listing.title):
+            reasons.append('title')
+        elif defect_filter.has_forbidden_phrase(listing.link.lower()):
+            reasons.append('url')
+        elif title_matches['ps_models']:
+            reasons.append('ps_model')
+        elif title_matches['switch_models']:
+            reasons.append('switch_model')
+        elif defect_filter.is_price_too_high(listing.title, listing.price):
+            reasons.append('price')
+        else:
+            reasons.append(None)
+    return reasons
+
+
+def batch(defect_filter, listings):
+    return defect_filter.rule_set().evaluate(listings, trust_prices=True)
+
+
+def timed(function, defect_filter, listings, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        reasons = function(defect_filter, listings)
+    return (time.perf_counter() - start) / repeat, reasons
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    try:
+        with open('olx_listings.json', 'r', encoding='utf-8') as f:
+            listings = [Listing.from_dict(row) for row in json.load(f)]
+    except (FileNotFoundError, json.JSONDecodeError):
+        print("No stored listings found (run the scraper first)")
+        return
+    listings = [listing for listing in listings if listing.title and listing.link]
+
+    defect_filter = OLXDefectFilter()
+    per_listing_time, per_listing_reasons = timed(per_listing, defect_filter, listings, repeat)
+    batch_time, batch_reasons = timed(batch, defect_filter, listings, repeat)
+
+    print(f"Listings: {len(listings)}, {repeat} repeats")
+    print(f"  Per listing: {per_listing_time * 1000:8.2f} ms per pass")
+    print(f"  Batch:       {batch_time * 1000:8.2f} ms per pass")
+    print(f"  Speedup:     {per_listing_time / batch_time:8.2f}x")
+
+    untrusted = defect_filter.rule_set().evaluate(listings)
+    for label, reasons in (("without trusted prices", untrusted), ("with trusted prices", batch_reasons)):
+        fetches = sum(reason is None for reason in reasons)
+        print(f"Listing pages to fetch {label}: {fetches} of {len(listings)}")
+
+    # Only euro prices differ: the per-listing check compared them with the limits in lei
+    differences = [
+        (listing.title[:60], listing.price, old, new)
+        for listing, old, new in zip(listings, per_listing_reasons, batch_reasons) if old != new
+    ]
+    print(f"Differing reasons (prices in euro): {len(differences)}")
+    for title, price, old, new in differences[:10]:
+        print(f"  {title!r} ({price}): {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
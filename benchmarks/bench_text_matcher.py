@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compiled rule matchers against the original per-phrase loops
+
+Runs over the stored listing titles and links (olx_listings.json) and over the
+descriptions of listing pages in the page cache (.http_cache), if any.
+
+The comparison is repeated with 200 extra synthetic forbidden phrases, to show
+how each approach scales with the size of the rule set.
+
+Usage: python benchmarks/bench_text_matcher.py [repeat]
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filter_defect_listings import OLXDefectFilter
+
+LEGACY_MODELS = [
+    ["xbox series x", "xbox series s", "xbox one x", "xbox one s", "xbox one"],
+    ["ps5 digital", "ps5", "ps4 pro", "ps4 slim", "ps4"],
+    ["nintendo switch", "switch"]
+]
+
+
+def legacy_has_forbidden_phrase(phrases, text):
+    text_lower = text.lower()
+    for phrase in phrases:
+        if phrase in text_lower:
+            return True
+    return False
+
+
+def legacy_identify_model(title):
+    title_lower = title.lower()
+    for models in LEGACY_MODELS:
+        for model in models:
+            if model in title_lower:
+                return model
+    return None
+
+
+def legacy_classify(defect_filter, text):
+    text_lower = text.lower()
+    return (
+        legacy_has_forbidden_phrase(defect_filter.forbidden_phrases, text),
+        legacy_identify_model(text),
+        any(excluded in text_lower for excluded in defect_filter.excluded_ps_models),
+        any(excluded in text_lower for excluded in defect_filter.excluded_switch_models)
+    )
+
+
+def compiled_classify(matcher, text):
+    # One pass per text: results are shared by phrase combination, never by text, so every repeat scans
+    matches = matcher.match(text)
+    return (
+        bool(matches['forbidden']),
+        matches['models'][0] if matches['models'] else None,
+        bool(matches['ps_models']),
+        bool(matches['switch_models'])
+    )
+
+
+def load_texts(defect_filter):
+    texts = []
+    try:
+        with open('olx_listings.json', 'r', encoding='utf-8') as f:
+            for listing in json.load(f):
+                texts.append(listing['title'])
+                texts.append(listing['link'])
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+
+    descriptions = 0
+    for path in glob.glob(os.path.join('.http_cache', 'listing-*.html')):
+        with open(path, 'r', encoding='utf-8') as f:
+            description = defect_filter.extract_description(f.read(), path)
+        if description:
+            texts.append(description)
+            descriptions += 1
+    return texts, descriptions
+
+
+def timed(function, rules, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [function(rules, text) for text in texts]
+    return (time.perf_counter() - start) / repeat, results
+
+
+def compare(defect_filter, texts, repeat, label):
+    legacy_time, legacy_results = timed(legacy_classify, defect_filter, texts, repeat)
+    # The matcher is looked up once, as RuleSet.evaluate does for a batch
+    compiled_time, compiled_results = timed(compiled_classify, defect_filter.rule_matcher(), texts, repeat)
+
+    print(f"\n{label} ({len(defect_filter.forbidden_phrases)} forbidden phrases)")
+    print(f"  Legacy loops:      {legacy_time * 1000:8.2f} ms per pass")
+    print(f"  Compiled matchers: {compiled_time * 1000:8.2f} ms per pass")
+    print(f"  Speedup:           {legacy_time / compiled_time:8.2f}x")
+    return [
+        (text[:60], old, new) for text, old, new in zip(texts, legacy_results, compiled_results) if old != new
+    ]
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    defect_filter = OLXDefectFilter()
+    texts, descriptions = load_texts(defect_filter)
+    if not texts:
+        print("No stored listings found (run the scraper first)")
+        return
+
+    print(f"Texts: {len(texts)} ({descriptions} cached descriptions), "
+          f"{sum(len(text) for text in texts)} characters, {repeat} repeats")
+    differences = compare(defect_filter, texts, repeat, "Current rules")
+
+    defect_filter.forbidden_phrases = defect_filter.forbidden_phrases + [
+        f"anunt {word} {number}" for word in ("vechi", "test", "demo", "copie") for number in range(50)
+    ]
+    compare(defect_filter, texts, repeat, "Scaled rules")
+
+    print(f"\nDiffering verdicts with current rules (diacritic/hyphen normalization): {len(differences)}")
+    for text, old, new in differences[:10]:
+        print(f"  {text!r}: {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
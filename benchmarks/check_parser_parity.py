@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check that the lxml parser backend extracts exactly what the BeautifulSoup one does, and time both
+
+Runs every extractor (listings, next page URL, detail price, description) over the
+synthetic pages in benchmarks/fixtures and over the listing pages in the page cache
+(.http_cache, real pages from earlier runs), if any. Exits with status 1 if any output differs.
+
+Usage: python benchmarks/check_parser_parity.py [repeat]
+"""
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from olx_scraper import OLXScraper
+from filter_defect_listings import OLXDefectFilter
+from parsed_page import ParsedPage
+
+SEARCH_URL = 'https://www.olx.ro/electronice-si-electrocasnice/jocuri-console/q-console-defecte/'
+
+
+def load_pages():
+    """Return (name, html, is_search_page) for every fixture and cached listing page"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'fixtures', '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read(), os.path.basename(path).startswith('search_')))
+    for path in sorted(glob.glob(os.path.join(ROOT, '.http_cache', '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read(), os.path.basename(path).startswith('url-')))
+    return pages
+
+
+def extract(scraper, defect_filter, html, is_search_page):
+    """Run the extractors for one page on a fresh parse, with their progress output captured"""
+    page = ParsedPage(html, SEARCH_URL)
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        if is_search_page:
+            result = scraper.parse_search_page(page, SEARCH_URL)
+        else:
+            result = defect_filter.parse_detail_page(page, SEARCH_URL)
+    return result, output.getvalue()
+
+
+def timed(backend, pages, repeat):
+    scraper = OLXScraper(parser_backend=backend, structured_data=False)
+    defect_filter = OLXDefectFilter(parser_backend=backend)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [extract(scraper, defect_filter, html, is_search_page) for _, html, is_search_page in pages]
+    return (time.perf_counter() - start) / repeat, results
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = load_pages()
+    print(f"Pages: {len(pages)} ({sum(len(html) for _, html, _ in pages)} characters), {repeat} repeats")
+
+    bs4_time, bs4_results = timed('bs4', pages, repeat)
+    lxml_time, lxml_results = timed('lxml', pages, repeat)
+    print(f"  BeautifulSoup: {bs4_time * 1000:8.2f} ms per pass")
+    print(f"  lxml + XPath:  {lxml_time * 1000:8.2f} ms per pass")
+    print(f"  Speedup:       {bs4_time / lxml_time:8.2f}x")
+
+    differences = [
+        (name, old, new) for (name, _, _), old, new in zip(pages, bs4_results, lxml_results) if old != new
+    ]
+    print(f"\nPages with differing output: {len(differences)}")
+    for name, old, new in differences:
+        print(f"  {name}:\n    bs4:  {old!r}\n    lxml: {new!r}")
+    if differences:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for olx.ro serving the synthetic pages in benchmarks/fixtures
+
+The fixtures are hand-made: they follow the markup variants the parsers handle
+(embedded state, JSON-LD, listing cards, ...), with generated categories and fake
+listing IDs. They are not captures of olx.ro, so throughput measured on them is
+indicative only.
+
+Any path containing /oferta/ is a listing page; every other path is a search whose
+page=N parameter selects a fixture search page. Listing IDs are rewritten per search
+and page so each page holds new listings, links point back at this server, and pages
+after the last one are empty. Responses can be delayed, and every Nth request or every
+request over a tolerated rate answered with 429 Too Many Requests, to exercise pacing
+and retries.
+
+Connections are kept alive (HTTP/1.1) and bodies are gzip-compressed for clients that
+accept it, like olx.ro. GET /__stats returns the request, connection and byte counters
+as JSON; GET /__reset clears them.
+
+Usage: python benchmarks/olx_standin.py [--port 8765] [--pages 5] [--latency 0.05 0.2] [--throttle-every 0]
+                                        [--tolerated-rate 0]
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+EMPTY_PAGE = '<!DOCTYPE html><html><body><p>Nu am găsit niciun anunț</p></body></html>'
+
+
+def load_fixtures(prefix):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, prefix + '*.html'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+class StandIn:
+    """The fixture pages, rewritten on the fly, and the request counters"""
+
+    def __init__(self, pages=5, latency=(0.0, 0.0), throttle_every=0, retry_after=1, tolerated_rate=0, seed=0):
+        self.search_pages = load_fixtures('search_')
+        self.detail_pages = load_fixtures('detail_')
+        self.pages = pages
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.tolerated_rate = tolerated_rate
+        self.recent = deque()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.counts = Counter()
+            self.bytes_sent = 0
+            self.wire_bytes = 0
+            self.connections = 0
+
+    def stats(self):
+        with self.lock:
+            return {'requests': self.requests, 'connections': self.connections, 'bytes_sent': self.bytes_sent,
+                    'wire_bytes': self.wire_bytes, 'counts': dict(self.counts)}
+
+    def search_page(self, base, path, page):
+        """Fixture search page number `page` of the search at `path`, or an empty page"""
+        if page > self.pages:
+            return EMPTY_PAGE
+        _, html = self.search_pages[(page - 1) % len(self.search_pages)]
+        tag = f"s{zlib.crc32(path.encode()) % 1000}p{page}"
+        html = re.sub(r'-ID([0-9a-zA-Z]+)\.html', lambda m: f"-ID{m.group(1)}{tag}.html", html)
+        html = re.sub(r'page=\d+', f"page={page + 1}", html)
+        # Page counters inside the JSON-encoded app state
+        html = re.sub(r'(\\"pageNumber\\":\s*)\d+', rf'\g<1>{page}', html)
+        html = re.sub(r'(\\"totalPages\\":\s*)\d+', rf'\g<1>{self.pages}', html)
+        return self.localize(base, html)
+
+    def detail_page(self, base, path):
+        """A fixture listing page, always the same one for the same listing"""
+        _, html = self.detail_pages[zlib.crc32(path.encode()) % len(self.detail_pages)]
+        return self.localize(base, html)
+
+    @staticmethod
+    def localize(base, html):
+        """Point absolute and root-relative links at this server"""
+        html = html.replace('https://www.olx.ro', base)
+        return re.sub(r'href="/', f'href="{base}/', html)
+
+    def respond(self, base, raw_path):
+        """Return (status, headers, body) for a request, updating the counters"""
+        url = urlparse(raw_path)
+        with self.lock:
+            self.requests += 1
+            throttled = self.throttle_every and self.requests % self.throttle_every == 0
+            if self.tolerated_rate:
+                # Like a real rate limit: over `tolerated_rate` requests in the last second get a 429
+                now = time.monotonic()
+                while self.recent and self.recent[0] <= now - 1.0:
+                    self.recent.popleft()
+                if len(self.recent) >= self.tolerated_rate:
+                    throttled = True
+                else:
+                    self.recent.append(now)
+            delay = self.random.uniform(*self.latency)
+        time.sleep(delay)
+
+        kind = 'detail' if '/oferta/' in url.path else 'search'
+        if throttled:
+            status, headers, body = 429, {'Retry-After': str(self.retry_after)}, 'Too Many Requests'
+        elif kind == 'detail':
+            status, headers, body = 200, {}, self.detail_page(base, url.path)
+        else:
+            page = int(parse_qs(url.query).get('page', ['1'])[0])
+            status, headers, body = 200, {}, self.search_page(base, url.path, page)
+
+        body = body.encode('utf-8')
+        with self.lock:
+            self.counts[f"{kind}_{status}"] += 1
+            self.bytes_sent += len(body)
+        return status, headers, body
+
+
+def make_handler(standin):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            super().setup()
+            with standin.lock:
+                standin.connections += 1
+
+        def do_GET(self):
+            base = f"http://{self.headers.get('Host')}"
+            if self.path == '/__stats':
+                status, headers, body = 200, {}, json.dumps(standin.stats()).encode('utf-8')
+            elif self.path == '/__reset':
+                standin.reset()
+                status, headers, body = 200, {}, b'{}'
+            else:
+                status, headers, body = standin.respond(base, self.path)
+            if 'gzip' in self.headers.get('Accept-Encoding', '') and len(body) > 1024:
+                body = gzip.compress(body, compresslevel=6)
+                headers = dict(headers, **{'Content-Encoding': 'gzip'})
+            with standin.lock:
+                standin.wire_bytes += len(body)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic OLX-like pages locally")
+    parser.add_argument('--port', type=int, default=8765, help="port to listen on (0: any free port)")
+    parser.add_argument('--pages', type=int, default=5, help="result pages per search (default: 5)")
+    parser.add_argument('--latency', type=float, nargs=2, default=[0.0, 0.0], metavar=('MIN', 'MAX'),
+                        help="response delay range in seconds")
+    parser.add_argument('--throttle-every', type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429")
+    parser.add_argument('--tolerated-rate', type=float, default=0,
+                        help="answer requests beyond this many per second with 429 (0: no limit)")
+    args = parser.parse_args()
+
+    standin = StandIn(args.pages, tuple(args.latency), args.throttle_every, args.retry_after, args.tolerated_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(standin))
+    server.daemon_threads = True
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Build the data files the website (index.html) reads, after the pipeline and price_tracker.py
+
+site_data/ gets:
+  manifest.json        generation time, listing count and the files below
+  listings-NNN.json    the kept listings of the latest run, PAGE_SIZE per file, with
+                       listing ID, numeric price, model and price change precomputed
+  history-NN.json      price history of those listings, sharded by history_shard(ID)
+and a gzip copy (.json.gz) of each. The page loads the manifest and the first listings
+page, then further pages on demand, and only the history shards of followed listings.
+"""
+
+import argparse
+import glob
+import gzip
+import json
+import os
+import time
+from price_history import PriceHistory, NO_PRICE, format_minor_units
+from storage import ListingStore, isoformat
+
+PAGE_SIZE = 100
+HISTORY_SHARDS = 16
+LISTING_COLUMNS = ['listing_id', 'title', 'price', 'price_value', 'model', 'location', 'date', 'link']
+
+
+def history_shard(listing_id):
+    """Shard number of a listing's price history; index.html computes the same"""
+    return sum(map(ord, listing_id)) % HISTORY_SHARDS
+
+
+def write_json(directory, name, data):
+    """Write a compact JSON file and its gzip copy; returns the manifest entry"""
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # mtime=0 keeps the .gz identical when the data is, so unchanged files are not recommitted
+    compressed = gzip.compress(raw, compresslevel=9, mtime=0)
+    for filename, content in ((name, raw), (name + '.gz', compressed)):
+        tmp_filename = os.path.join(directory, filename + '.tmp')
+        with open(tmp_filename, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_filename, os.path.join(directory, filename))
+    return {'file': name, 'bytes': len(raw), 'gzip_bytes': len(compressed)}
+
+
+def build(store, history, directory='site_data', page_size=PAGE_SIZE):
+    """Write the listing pages, history shards and manifest for the latest run; returns the manifest"""
+    os.makedirs(directory, exist_ok=True)
+    run_id = store.latest_run()
+    listings = store.iter_run_listings(run_id, kept_only=True, fields=LISTING_COLUMNS) if run_id else []
+    previous_price, previous_currency = history.previous_prices()
+
+    pages = []
+    page = []
+    listing_ids = []
+    for listing in listings:
+        listing_id = listing.pop('listing_id')
+        record = {'id': listing_id, **listing, 'price_change': None, 'old_price': None}
+        position = history.index.get(listing_id)
+        if position is not None and previous_price[position] != NO_PRICE:
+            latest = history.listings[position]
+            if latest['price'] != NO_PRICE and latest['currency'] == previous_currency[position]:
+                record['price_change'] = 'up' if latest['price'] > previous_price[position] else 'down'
+                record['old_price'] = format_minor_units(previous_price[position], previous_currency[position])
+        page.append(record)
+        listing_ids.append(listing_id)
+        if len(page) == page_size:
+            pages.append(write_json(directory, f"listings-{len(pages) + 1:03d}.json", page))
+            page = []
+    if page or not pages:
+        pages.append(write_json(directory, f"listings-{len(pages) + 1:03d}.json", page))
+
+    shards = [{} for _ in range(HISTORY_SHARDS)]
+    for listing_id, entry in history.histories(listing_ids).items():
+        shards[history_shard(listing_id)][listing_id] = entry
+    history_files = [write_json(directory, f"history-{i:02d}.json", shard) for i, shard in enumerate(shards)]
+
+    manifest = {
+        'generated_at': isoformat(time.time()),
+        'run_id': run_id,
+        'total_listings': len(listing_ids),
+        'page_size': page_size,
+        'pages': pages,
+        'history_shards': HISTORY_SHARDS,
+        'history': history_files
+    }
+    # The manifest goes last: until it is replaced, pages keep matching the old one
+    write_json(directory, 'manifest.json', manifest)
+
+    # Listing pages beyond the current count are left over from a larger run
+    current = {entry['file'] for entry in pages + history_files} | {'manifest.json'}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if os.path.basename(path) not in current:
+            os.remove(path)
+            if os.path.exists(path + '.gz'):
+                os.remove(path + '.gz')
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the website's listing pages and price history shards")
+    parser.add_argument('--output', default='site_data', help="output directory (default: site_data)")
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help=f"listings per page (default: {PAGE_SIZE})")
+    args = parser.parse_args()
+
+    store = ListingStore()
+    try:
+        manifest = build(store, PriceHistory(), args.output, args.page_size)
+    finally:
+        store.close()
+    size = sum(entry['bytes'] for entry in manifest['pages'] + manifest['history'])
+    gzip_size = sum(entry['gzip_bytes'] for entry in manifest['pages'] + manifest['history'])
+    print(f"📦 Built {len(manifest['pages'])} listing pages ({manifest['total_listings']} listings) and "
+          f"{manifest['history_shards']} history shards in {args.output}/: {size // 1024} KB, {gzip_size // 1024} KB gzipped")
+
+
+if __name__ == "__main__":
+    main()
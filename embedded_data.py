@@ -0,0 +1,151 @@
+"""
+Listing records from the structured data embedded in OLX search pages
+
+Search pages carry the app state they were rendered from (window.__PRERENDERED_STATE__)
+and often JSON-LD offers. Decoding that gives complete records, including location and
+date, in one JSON parse and without building a DOM tree.
+"""
+
+import json
+import re
+from urllib.parse import urljoin
+
+_STATE_MARKER = re.compile(r'window\.__PRERENDERED_STATE__\s*=\s*')
+_JSON_LD = re.compile(r'<script[^>]*type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.S | re.I)
+_LISTING_URL = re.compile(r'/oferta/|/d/oferta/')
+_DECODER = json.JSONDecoder()
+
+
+def prerendered_state(html_content):
+    """Decode window.__PRERENDERED_STATE__ (a JSON string holding JSON, or an object), or None"""
+    marker = _STATE_MARKER.search(html_content)
+    if not marker:
+        return None
+    try:
+        state, _ = _DECODER.raw_decode(html_content, marker.end())
+        if isinstance(state, str):
+            state = json.loads(state)
+    except json.JSONDecodeError:
+        return None
+    return state if isinstance(state, dict) else None
+
+
+_CURRENCY_SYMBOLS = {'RON': 'lei', 'EUR': '€'}
+
+
+def format_amount(value, currency):
+    """Format a number the way OLX shows prices ("1.250 lei", "99,50 €") so parse_price reads it back"""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return "N/A"
+    if value.is_integer():
+        amount = f"{int(value):,}".replace(',', '.')
+    else:
+        amount = f"{value:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.')
+    currency = currency or 'RON'
+    return f"{amount} {_CURRENCY_SYMBOLS.get(currency.upper(), currency.lower())}"
+
+
+def format_price(price):
+    """Price string as shown on the site ("1.250 lei"), from the state's price object"""
+    if not isinstance(price, dict):
+        return "N/A"
+    if price.get('displayValue'):
+        return price['displayValue']
+    regular = price.get('regularPrice') or {}
+    if regular.get('value') is None:
+        return "N/A"
+    return format_amount(regular['value'], regular.get('currencyCode'))
+
+
+def format_location(location):
+    """"City, District" from the state's location object"""
+    if not isinstance(location, dict):
+        return "N/A"
+    parts = [location.get('cityName'), location.get('districtName')]
+    return ', '.join(part for part in parts if part) or "N/A"
+
+
+def listings_from_state(state, base_url):
+    """Return (listings, has_next_page) from the app state, or None if it holds no search results
+
+    has_next_page is None when the state does not say.
+    """
+    listing_state = (state.get('listing') or {}).get('listing')
+    if not isinstance(listing_state, dict) or not isinstance(listing_state.get('ads'), list):
+        return None
+
+    listings = []
+    for ad in listing_state['ads']:
+        if not isinstance(ad, dict) or not ad.get('url'):
+            continue
+        listings.append({
+            'title': ad.get('title') or "No title",
+            'price': format_price(ad.get('price')),
+            'location': format_location(ad.get('location')),
+            'date': ad.get('lastRefreshTime') or ad.get('createdTime') or "N/A",
+            'link': urljoin(base_url, ad['url'])
+        })
+
+    has_next = None
+    page, total_pages = listing_state.get('pageNumber'), listing_state.get('totalPages')
+    if isinstance(page, int) and isinstance(total_pages, int):
+        has_next = page < total_pages
+    return listings, has_next
+
+
+def _offers(data):
+    """Yield every JSON-LD node (Offer, Product, ListItem) pointing at a listing page"""
+    if isinstance(data, list):
+        for item in data:
+            yield from _offers(item)
+    elif isinstance(data, dict):
+        if _LISTING_URL.search(str(data.get('url', ''))) and (data.get('name') or data.get('price') is not None):
+            yield data
+            return
+        for key in ('@graph', 'offers', 'itemListElement', 'item'):
+            if key in data:
+                yield from _offers(data[key])
+
+
+def listings_from_json_ld(html_content, base_url):
+    """Return listings from the JSON-LD offers of a search page (no pagination info), or None"""
+    listings = []
+    for script in _JSON_LD.findall(html_content):
+        try:
+            data = json.loads(script)
+        except json.JSONDecodeError:
+            continue
+        for offer in _offers(data):
+            # A Product carries its price in a nested Offer
+            priced = offer if offer.get('price') is not None else offer.get('offers')
+            price = "N/A"
+            if isinstance(priced, dict) and priced.get('price') is not None:
+                price = format_amount(priced['price'], priced.get('priceCurrency'))
+            area = offer.get('areaServed')
+            listings.append({
+                'title': offer.get('name') or "No title",
+                'price': price,
+                'location': area.get('name', "N/A") if isinstance(area, dict) else "N/A",
+                'date': "N/A",
+                'link': urljoin(base_url, offer['url'])
+            })
+    return listings or None
+
+
+def parse_search_page(html_content, base_url):
+    """Return (listings, has_next_page) from the embedded data of a search page, or None
+
+    The app state is preferred since it is complete; JSON-LD is used when the page has
+    no usable state. None means the caller should fall back to parsing the DOM.
+    """
+    state = prerendered_state(html_content)
+    if state is not None:
+        found = listings_from_state(state, base_url)
+        if found is not None:
+            return found
+    listings = listings_from_json_ld(html_content, base_url)
+    if listings:
+        return listings, None
+    return None
@@ -0,0 +1,183 @@
+"""
+Asyncio fetch engine used to crawl several OLX search pages at once
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+
+class PolitenessBudget:
+    """Shared request pacing: requests are started at most `requests_per_second` times per second"""
+
+    def __init__(self, requests_per_second=1.0):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def reserve(self):
+        """Reserve the next request slot and return how many seconds to wait for it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        """Block the calling thread until a request slot is available"""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self):
+        """Wait for a request slot without blocking the event loop"""
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (seconds or an HTTP date) into seconds from now, or None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter(PolitenessBudget):
+    """Token bucket whose rate follows what the server tolerates
+
+    Starts at `max_rate` requests per second. A 429 or 5xx (or a failed connection)
+    cuts the rate by `decrease`, never below `min_rate`; failures of requests that
+    were already in flight within a second of it count as the same one. A Retry-After
+    header pauses every request until it has passed (at most `max_pause` seconds). A response more than
+    `slow_factor` times slower than usual cuts the rate by a fifth. Every normal
+    response adds `increase` back, up to `max_rate` again.
+    """
+
+    def __init__(self, max_rate=1.0, min_rate=0.1, burst=1, increase=None, decrease=0.7, slow_factor=3.0,
+                 max_pause=120.0):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max_rate
+        self.burst = burst
+        self.increase = increase if increase is not None else max_rate / 100
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.max_pause = max_pause
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._backed_off_at = None
+        self._latency = None
+
+    def reserve(self):
+        """Take a token and return how many seconds to wait until it is available"""
+        if not self.max_rate:
+            return 0.0  # Unlimited
+        with self._lock:
+            now = time.monotonic()
+            if now > self._updated:
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+            self._tokens -= 1
+            ready = self._updated + max(0.0, -self._tokens) / self.rate
+            return max(0.0, ready - now)
+
+    def _pause_remaining(self):
+        return self._paused_until - time.monotonic()
+
+    def wait(self):
+        """Block the calling thread until a token is available and no pause is in effect"""
+        super().wait()
+        # A Retry-After may have arrived while this request was waiting.
+        # Read the clock once per check: the pause may end between two reads
+        remaining = self._pause_remaining()
+        while remaining > 0:
+            time.sleep(remaining)
+            remaining = self._pause_remaining()
+
+    async def wait_async(self):
+        """Wait for a token without blocking the event loop"""
+        await super().wait_async()
+        remaining = self._pause_remaining()
+        while remaining > 0:
+            await asyncio.sleep(remaining)
+            remaining = self._pause_remaining()
+
+    def record_success(self, latency):
+        """Speed up after a normal response, slow down if it was unusually slow"""
+        with self._lock:
+            if self._latency is not None and latency > self.slow_factor * self._latency:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            # Moving average of response times, the baseline for "unusually slow"
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+
+    def record_failure(self, status=None, retry_after=None):
+        """Back off after a 429/5xx response (status) or a failed connection (status None)"""
+        if status is not None and status != 429 and status < 500:
+            return  # Other client errors say nothing about the request rate
+        with self._lock:
+            now = time.monotonic()
+            self.throttled += 1
+            if self._backed_off_at is None or now - self._backed_off_at > 1.0:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._backed_off_at = now
+            if retry_after:
+                resume_at = now + min(retry_after, self.max_pause)
+                self._paused_until = max(self._paused_until, resume_at)
+                # Tokens only start accumulating again once the pause is over
+                self._updated = max(self._updated, self._paused_until)
+                self._tokens = min(self._tokens, 0.0)
+
+    def record_error(self, error):
+        """record_failure for a requests exception, reading the status and Retry-After of its response"""
+        response = getattr(error, 'response', None)
+        if response is None:
+            self.record_failure()
+        else:
+            self.record_failure(response.status_code, retry_after_seconds(response.headers.get('Retry-After')))
+
+
+class AsyncFetchEngine:
+    """Run a blocking fetch function concurrently with a per-host cap and a shared budget"""
+
+    def __init__(self, fetch, max_per_host=4, requests_per_second=1.0, max_workers=8, budget=None):
+        self.fetch = fetch
+        self.max_per_host = max_per_host
+        self.budget = budget or PolitenessBudget(requests_per_second)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._host_limits = {}
+
+    def _host_limit(self, url):
+        """Return the semaphore that caps concurrent requests to the URL's host"""
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def fetch_async(self, url):
+        """Fetch a URL in the worker pool once the host cap and the budget allow it"""
+        async with self._host_limit(url):
+            await self.budget.wait_async()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.fetch, url)
+
+    def run(self, coroutine):
+        """Run a crawl coroutine to completion on a fresh event loop"""
+        # Semaphores are bound to the loop they were first used on
+        self._host_limits = {}
+        return asyncio.run(coroutine)
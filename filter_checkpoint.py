@@ -0,0 +1,80 @@
+"""
+Checkpoint of a filter run, so a killed run can be resumed where it stopped
+
+Every verified row is appended to a JSON Lines file as listing ID, row fingerprint
+(title, price and filter rules) and verdict. Lines are buffered and written with an
+fsync every `every` rows or `interval` seconds; a line cut short by a kill is ignored
+on load. A resumed run skips the rows whose fingerprint is unchanged. The file is
+removed once a run completes.
+"""
+
+import json
+import os
+import threading
+import time
+
+
+class FilterCheckpoint:
+    """Append-only log of the verdicts of the current filter run"""
+
+    def __init__(self, filename='filter_checkpoint.jsonl', every=25, interval=30.0):
+        self.filename = filename
+        self.every = every
+        self.interval = interval
+        self.pending = []
+        self.flushed_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Return {listing ID: (row fingerprint, excluded)} of the rows already verified"""
+        completed = {}
+        valid_bytes = 0
+        try:
+            with open(self.filename, 'r+b') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        break
+                    if not line.endswith(b'\n'):
+                        break
+                    completed[entry['id']] = (entry['fingerprint'], entry['excluded'])
+                    valid_bytes += len(line)
+                # Cut the line a killed run left unfinished, so new lines start cleanly
+                f.truncate(valid_bytes)
+        except FileNotFoundError:
+            pass
+        return completed
+
+    def record(self, listing_id, row_fingerprint, excluded):
+        """Add a verdict; returns True if this call wrote the checkpoint"""
+        with self.lock:
+            self.pending.append(json.dumps(
+                {'id': listing_id, 'fingerprint': row_fingerprint, 'excluded': excluded}, ensure_ascii=False
+            ))
+            if len(self.pending) < self.every and time.monotonic() - self.flushed_at < self.interval:
+                return False
+            self._flush()
+            return True
+
+    def flush(self):
+        """Write the buffered verdicts"""
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        self.flushed_at = time.monotonic()
+        if not self.pending:
+            return
+        with open(self.filename, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(self.pending) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending = []
+
+    def clear(self):
+        """Drop the checkpoint (a new run, or the current one completed)"""
+        with self.lock:
+            self.pending = []
+            if os.path.exists(self.filename):
+                os.remove(self.filename)
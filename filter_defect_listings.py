@@ -1,18 +1,68 @@
 import csv
 import json
 import requests
-from bs4 import BeautifulSoup
 import re
-import time
+import asyncio
+import collections
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import urljoin
+from fetch_engine import AdaptiveRateLimiter
+from transport import Transport
+from http_cache import HTTPCache
+from parsed_page import ParsedPage
+import lxml_extract
+from run_metrics import RunMetrics
+from text_matcher import MATCHER_VERSION
+from listing import Listing, MODEL_PRIORITY, get_listing_id, price_value
+from verdict_store import fingerprint
+from rules import RuleSet, EXCHANGE_RATES
+from filter_checkpoint import FilterCheckpoint
+from listing_writers import CSVListingWriter
+
+# How prescreen() reports each exclusion reason
+PRESCREEN_MESSAGES = {
+    'manual': 'manually excluded',
+    'title': 'title quality',
+    'url': 'URL quality',
+    'ps_model': 'unwanted PS model',
+    'switch_model': 'unwanted Switch model',
+    'price': 'price too high'
+}
+
 
 class OLXDefectFilter:
-    def __init__(self):
-        self.session = requests.Session()
-        # Set a user agent to avoid being blocked
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+    # check_listing reasons that keep the listing in the output
+    KEEP_REASONS = ('keep', 'unverified')
+
+    # Console models in priority order: Xbox, PlayStation, Nintendo Switch, most specific first
+    MODEL_PRIORITY = MODEL_PRIORITY
+
+    def __init__(self, requests_per_second=2.0, cache=None, verdicts=None, parser_backend='bs4', metrics=None,
+                 rate_limiter=None, parser_pool=None, transport=None):
+        # Pooled HTTP session; pass one Transport to share its connections with the scraper
+        self.transport = transport or Transport(pool_size=8)
+
+        # One adaptive rate limiter shared by every worker checking listing pages (and
+        # optionally with the scraper): up to `requests_per_second`, slower while throttled
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(max_rate=requests_per_second)
+
+        # Optional HTTPCache shared across runs (conditional GETs for unchanged pages)
+        self.cache = cache
+
+        # Optional SQLiteVerdictStore (storage.py): unchanged listings keep their verdict without a page fetch
+        self.verdicts = verdicts
+
+        # 'bs4' (BeautifulSoup) or 'lxml' (raw lxml tree with precompiled XPath, same results)
+        if parser_backend not in ('bs4', 'lxml'):
+            raise ValueError(f"Unknown parser backend: {parser_backend}")
+        self.parser_backend = parser_backend
+
+        # Fetch, parse and verdict metrics; pass one RunMetrics to share it with the scraper
+        self.metrics = metrics or RunMetrics()
+
+        # Optional parse_workers.ParserPool: listing pages are parsed and checked in worker processes
+        self.parser_pool = parser_pool
 
         # Forbidden phrases that indicate items WITHOUT defects or are too good quality
         self.forbidden_phrases = [
@@ -60,98 +110,74 @@ class OLXDefectFilter:
             "nintendo switch": 400
         }
 
+        # Lei per euro etc., so prices in other currencies are compared with the limits above
+        self.exchange_rates = dict(EXCHANGE_RATES)
+
+        # Apply the price limits to the scraped price before any listing page is fetched.
+        # Off by default: the price on the listing page, which may differ, decides.
+        self.trust_listing_prices = False
+
+        self._rule_set_key = None
+
     def get_page(self, url, max_retries=3):
         """Fetch a page with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                print(f"Attempt {attempt + 1} failed for {url}: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    print(f"Failed to fetch {url} after {max_retries} attempts")
-                    return None
+        try:
+            return self.transport.fetch(url, 'detail', self.rate_limiter, self.metrics, self.cache, max_retries)
+        except requests.RequestException:
+            print(f"Failed to fetch {url} after {max_retries} attempts")
+            return None
+
+    def rule_set(self):
+        """RuleSet compiled from the current rules, rebuilt only when one changes"""
+        key = (tuple(self.forbidden_phrases), tuple(self.excluded_ps_models), tuple(self.excluded_switch_models),
+               tuple(sorted(self.price_limits.items())), tuple(sorted(self.exchange_rates.items())))
+        if self._rule_set_key != key:
+            self._rule_set = RuleSet(self.forbidden_phrases, self.excluded_ps_models, self.excluded_switch_models,
+                                     self.price_limits, self.exchange_rates)
+            self._rule_set_key = key
+        return self._rule_set
+
+    def rule_matcher(self):
+        """Matcher compiled from the current rule lists"""
+        return self.rule_set().matcher
 
     def has_forbidden_phrase(self, text):
         """Check if text contains any forbidden phrases"""
         if not text:
             return False
 
-        text_lower = text.lower()
-
-        # Check for exact phrases (not just individual words)
-        for phrase in self.forbidden_phrases:
-            if phrase in text_lower:
-                return True
-        return False
+        # One pass over the normalized text for all phrases (diacritics and hyphens ignored)
+        return bool(self.rule_matcher().match(text)['forbidden'])
 
     def identify_model(self, title):
         """Identify the console model from the title (Xbox, PS, Switch)"""
-        title_lower = title.lower()
-
-        # Check Xbox models (most specific first)
-        xbox_models = ["xbox series x", "xbox series s", "xbox one x", "xbox one s", "xbox one"]
-        for model in xbox_models:
-            if model in title_lower:
-                return model
-
-        # Check PlayStation models
-        ps_models = ["ps5 digital", "ps5", "ps4 pro", "ps4 slim", "ps4"]
-        for model in ps_models:
-            if model in title_lower:
-                return model
-
-        # Check Nintendo Switch models
-        switch_models = ["nintendo switch", "switch"]
-        for model in switch_models:
-            if model in title_lower:
-                return model
-
-        return None
+        models = self.rule_matcher().match(title)['models']
+        return models[0] if models else None
 
     def identify_xbox_model(self, title):
         """Legacy method for backward compatibility"""
         return self.identify_model(title)
 
-    def parse_price(self, price_string):
+    @staticmethod
+    def parse_price(price_string):
         """Parse price string and return numeric value"""
-        if not price_string or price_string == "N/A":
-            return None
-
-        # Remove currency and clean up
-        price_str = price_string.lower().replace("lei", "").replace("ron", "").replace("€", "").replace("eur", "").strip()
-
-        # Handle Romanian number format (1.234,56)
-        price_str = price_str.replace(".", "").replace(",", ".")
+        return price_value(price_string)
 
-        try:
-            return float(price_str)
-        except ValueError:
-            return None
+    def is_price_too_high(self, title, price_string, model=None):
+        """Check if the price exceeds the limit for the model (identified from the title unless given)
 
-    def is_price_too_high(self, title, price_string):
-        """Check if the price exceeds the limit for the identified Xbox model"""
-        model = self.identify_xbox_model(title)
-        if not model:
-            return False  # If we can't identify the model, don't exclude based on price
-
-        price_limit = self.price_limits.get(model)
-        if not price_limit:
-            return False
-
-        price = self.parse_price(price_string)
-        if price is None:
-            return False  # If we can't parse the price, don't exclude
-
-        return price > price_limit
+        Prices in euro are converted with self.exchange_rates. Without a model, a limit
+        or a parseable price, nothing is excluded.
+        """
+        return self.rule_set().price_too_high(model or self.identify_xbox_model(title), price_string)
 
     def extract_description(self, html_content, base_url):
-        """Extract description from OLX listing page"""
+        """Extract description from OLX listing page (raw HTML or a ParsedPage)"""
         try:
-            soup = BeautifulSoup(html_content, 'lxml')
+            page = ParsedPage.of(html_content, base_url)
+            if self.parser_backend == 'lxml':
+                return lxml_extract.extract_description(page.tree)
+            soup = page.soup
 
             # Common selectors for OLX description
             description_selectors = [
@@ -170,11 +196,10 @@ class OLXDefectFilter:
                     if description and len(description) > 20:  # Filter out very short texts
                         return description
 
-            # Fallback: look for any div with substantial text content
-            for div in soup.find_all('div'):
-                text = div.get_text(strip=True)
-                if len(text) > 100 and not any(skip in text.lower() for skip in ['telefon', 'email', 'contact']):
-                    return text
+            # Fallback: the div that looks most like a block of prose, found in one pass over the soup
+            div = lxml_extract.locate_description_soup(soup)
+            if div is not None:
+                return div.get_text(strip=True)
 
         except Exception as e:
             print(f"Error extracting description: {e}")
@@ -183,15 +208,16 @@ class OLXDefectFilter:
 
     def get_listing_id(self, link):
         """Extract listing ID from URL"""
-        # Extract listing ID from URL pattern like -IDxxxxx.html
-        import re
-        match = re.search(r'-ID([a-zA-Z0-9]+)\.html', link)
-        return match.group(1) if match else link
+        return get_listing_id(link)
 
     def extract_price_from_page(self, html_content):
-        """Extract the most accurate price from an individual listing page"""
+        """Extract the most accurate price from an individual listing page (raw HTML or a ParsedPage)"""
         try:
-            soup = BeautifulSoup(html_content, 'lxml')
+            page = ParsedPage.of(html_content)
+            if self.parser_backend == 'lxml':
+                price = lxml_extract.extract_price(page.tree)
+                return price or self.price_from_text(lxml_extract.page_text(page.tree))
+            soup = page.soup
 
             # First, try to find price in OLX-specific price display elements
             olx_price_selectors = [
@@ -211,15 +237,10 @@ class OLXDefectFilter:
                     price_match = re.search(r'(\d+(?:\.\d{3})*(?:,\d{2})?)\s*(lei|€|eur|ron)', price_text, re.I)
                     if price_match:
                         price_str, currency = price_match.groups()
-                        try:
-                            numeric_str = price_str.replace('.', '').replace(',', '.')
-                            numeric_value = float(numeric_str)
-                            if 10 <= numeric_value <= 10000:  # Reasonable range check
-                                final_price = f"{price_str} {currency}"
-                                print(f"  Found price in OLX element: {final_price}")
-                                return final_price
-                        except ValueError:
-                            continue
+                        if 10 <= price_value(price_str) <= 10000:  # Reasonable range check
+                            final_price = f"{price_str} {currency}"
+                            print(f"  Found price in OLX element: {final_price}")
+                            return final_price
 
             # Fallback: Look for structured data (JSON-LD)
             json_scripts = soup.find_all('script', type='application/ld+json')
@@ -244,190 +265,383 @@ class OLXDefectFilter:
                     continue
 
             # Last resort: Scan all text but be more selective
-            all_text = soup.get_text()
-            price_matches = re.findall(r'(\d+(?:\.\d{3})*(?:,\d{2})?)\s*(lei|€|eur|ron)', all_text, re.I)
-
-            if price_matches:
-                # Filter and score prices
-                realistic_prices = []
-                for match in price_matches:
-                    price_str, currency = match
-                    try:
-                        numeric_str = price_str.replace('.', '').replace(',', '.')
-                        numeric_value = float(numeric_str)
-
-                        # Stricter filtering - exclude prices that might be model numbers
-                        if 50 <= numeric_value <= 5000:  # Reasonable range for used electronics
-                            # Additional check: exclude prices that appear to be model numbers
-                            # (prices ending in common model number patterns)
-                            if not re.search(r'(g\d{2,}|xbox|one|s|x)$', price_str, re.I):
-                                realistic_prices.append((numeric_value, f"{price_str} {currency}"))
-                                print(f"  Found text price: {price_str} {currency}")
-
-                    except ValueError:
-                        continue
-
-                if realistic_prices:
-                    # Sort by confidence (prefer prices in typical ranges)
-                    def price_confidence(price_info):
-                        price_val = price_info[0]
-                        if 200 <= price_val <= 1500:  # Sweet spot for Xbox items
-                            return 3
-                        elif 100 <= price_val <= 2500:
-                            return 2
-                        else:
-                            return 1
-
-                    realistic_prices.sort(key=lambda x: (price_confidence(x), x[0]), reverse=True)
-                    selected_price = realistic_prices[0][1]
-                    print(f"  Selected price: {selected_price}")
-                    return selected_price
+            return self.price_from_text(soup.get_text())
 
         except Exception as e:
             print(f"Error extracting price from page: {e}")
 
         return None
 
+    def price_from_text(self, all_text):
+        """Pick the most plausible price mentioned anywhere in a page's text, or None"""
+        price_matches = re.findall(r'(\d+(?:\.\d{3})*(?:,\d{2})?)\s*(lei|€|eur|ron)', all_text, re.I)
+
+        if price_matches:
+            # Filter and score prices
+            realistic_prices = []
+            for match in price_matches:
+                price_str, currency = match
+                numeric_value = price_value(price_str)
+
+                # Stricter filtering - exclude prices that might be model numbers
+                if 50 <= numeric_value <= 5000:  # Reasonable range for used electronics
+                    # Additional check: exclude prices that appear to be model numbers
+                    # (prices ending in common model number patterns)
+                    if not re.search(r'(g\d{2,}|xbox|one|s|x)$', price_str, re.I):
+                        realistic_prices.append((numeric_value, f"{price_str} {currency}"))
+                        print(f"  Found text price: {price_str} {currency}")
+
+            if realistic_prices:
+                # Sort by confidence (prefer prices in typical ranges)
+                def price_confidence(price_info):
+                    price_val = price_info[0]
+                    if 200 <= price_val <= 1500:  # Sweet spot for Xbox items
+                        return 3
+                    elif 100 <= price_val <= 2500:
+                        return 2
+                    else:
+                        return 1
+
+                realistic_prices.sort(key=lambda x: (price_confidence(x), x[0]), reverse=True)
+                selected_price = realistic_prices[0][1]
+                print(f"  Selected price: {selected_price}")
+                return selected_price
+
+        return None
+
+    def parse_detail_page(self, html_content, url):
+        """Parse a listing page once and return (price, description)"""
+        page = ParsedPage.of(html_content, url)
+        return self.extract_price_from_page(page), self.extract_description(page, url)
+
     def should_exclude_listing(self, title, link, price=None, excluded_listings=None):
         """Check if a listing should be excluded based on title, URL, description, and price"""
-        # Check if listing is in permanent exclusion list
-        if excluded_listings:
-            listing_id = self.get_listing_id(link)
-            if listing_id in excluded_listings:
-                print(f"❌ Excluding (manually excluded): {title[:50]}...")
-                return True
-
-        # Check title for forbidden phrases
-        if self.has_forbidden_phrase(title):
-            print(f"❌ Excluding (title quality): {title[:50]}...")
-            return True
-
-        # Also check URL for forbidden phrases (since titles might be incomplete)
-        url_lower = link.lower()
-        if self.has_forbidden_phrase(url_lower):
-            print(f"❌ Excluding (URL quality): {title[:50]}...")
-            return True
-
+        return self.check_listing(title, link, price, excluded_listings) not in self.KEEP_REASONS
+
+    def prescreen(self, listings, excluded_listings=None):
+        """Apply the rules that need no listing page to a batch of Listings
+
+        Returns one exclusion reason per listing ('manual', 'title', 'url', 'ps_model',
+        'switch_model', or 'price' with trust_listing_prices), None where the listing
+        page has to be checked or the listing has no title/link.
+        """
+        reasons = self.rule_set().evaluate(listings, excluded_listings, self.trust_listing_prices)
+        for i, listing in enumerate(listings):
+            if not listing.title or not listing.link:
+                reasons[i] = None
+            elif reasons[i] is not None:
+                print(f"❌ Excluding ({PRESCREEN_MESSAGES[reasons[i]]}): {listing.title[:50]}...")
+                self.metrics.count('exclusion_reason', reason=reasons[i])
+        return reasons
+
+    def check_listing(self, title, link, price=None, excluded_listings=None, model=None, screened=False):
+        """Return the reason a listing is excluded, or 'keep' / 'unverified' if it is kept
+
+        `model` is the model already identified from the title (Listing.model), if known.
+        With screened=True the listing already went through prescreen().
+        """
+        if not screened:
+            reason = self.prescreen([Listing(title, price, link=link)], excluded_listings)[0]
+            if reason is not None:
+                return reason
+        with self.metrics.timer('check_seconds'):
+            reason = self._check_listing(title, link, price, model)
+        self.metrics.count('exclusion_reason', reason=reason)
+        return reason
+
+    def _check_listing(self, title, link, price, model):
         # Fetch the individual page to get accurate price and description
         print(f"🔍 Checking listing page for: {title[:50]}...")
 
         html_content = self.get_page(link)
         if not html_content:
             print("⚠️  Could not fetch page, keeping listing")
-            return False
+            return 'unverified'
+
+        if self.parser_pool is not None:
+            # Parsed in a worker process, outside the GIL shared with the fetching threads
+            return self.parser_pool.check_page(title, link, price, html_content, self.metrics, model)
+        return self.check_page(title, link, price, html_content, model)
+
+    def check_page(self, title, link, price, html_content, model=None):
+        """The checks that need the listing page: page price, price limit and description"""
+        # Parse the page once; the price and description extractors share the tree
+        page = ParsedPage(html_content, link)
 
         # Get the accurate price from the individual page
-        accurate_price = self.extract_price_from_page(html_content)
+        with self.metrics.timer('parse_seconds', page='detail', step='price'):
+            accurate_price = self.extract_price_from_page(page)
+        self.metrics.count('price_source', source='page' if accurate_price else 'listing')
         if accurate_price:
             print(f"📊 Price from page: {accurate_price} (was: {price})")
             # Use the accurate price for filtering
             price = accurate_price
 
-        # Check for unwanted PlayStation models
-        title_lower = title.lower()
-        if any(excluded in title_lower for excluded in self.excluded_ps_models):
-            print(f"❌ Excluding (unwanted PS model): {title[:50]}...")
-            return True
-
-        # Check for unwanted Switch models
-        if any(excluded in title_lower for excluded in self.excluded_switch_models):
-            print(f"❌ Excluding (unwanted Switch model): {title[:50]}...")
-            return True
-
         # Check if price is too high for the model (using accurate price)
-        if self.is_price_too_high(title, price):
-            model = self.identify_model(title)
+        model = model or self.identify_model(title)
+        if self.is_price_too_high(title, price, model):
             if model:
                 price_limit = self.price_limits.get(model, 0)
                 print(f"❌ Excluding (price too high - {price} > {price_limit} for {model}): {title[:50]}...")
-                return True
+                return 'price'
 
         # Check description for forbidden phrases
-        description = self.extract_description(html_content, link)
+        with self.metrics.timer('parse_seconds', page='detail', step='description'):
+            description = self.extract_description(page, link)
 
         if self.has_forbidden_phrase(description):
             print(f"❌ Excluding (description quality): {title[:50]}...")
-            return True
+            return 'description'
 
         print(f"✅ Keeping: {title[:50]}...")
-        return False
+        return 'keep'
+
+    def rules_fingerprint(self):
+        """Hash of the current filter rules; any rule change invalidates stored verdicts"""
+        return fingerprint(
+            MATCHER_VERSION,
+            self.MODEL_PRIORITY,
+            self.forbidden_phrases,
+            self.excluded_ps_models,
+            self.excluded_switch_models,
+            self.price_limits,
+            self.exchange_rates
+        )
+
+    def check_row(self, row, excluded_listings, screened=False):
+        """Return True if the listing (a Listing or a CSV row) should be excluded, or None if it has no title/link
+
+        With screened=True the row already went through prescreen() (and was not excluded).
+        """
+        listing = Listing.of(row)
+        title = listing.title or ''
+        link = listing.link or ''
+        if not title or not link:
+            return None
 
-    def filter_listings(self, input_file, output_file, max_listings=None):
-        """Filter listings from CSV file"""
+        price = listing.price or ''
+        listing_id = listing.listing_id
+        manually_excluded = bool(excluded_listings) and listing_id in excluded_listings
+
+        # Reuse the previous verdict while title, price and rules are unchanged
+        listing_fingerprint = fingerprint(title, price, self.rules_fingerprint())
+        if self.verdicts is not None and not manually_excluded:
+            reason = self.verdicts.get(listing_id, listing_fingerprint)
+            if reason is not None:
+                print(f"♻️  Cached verdict ({reason}): {title[:50]}...")
+                self.metrics.count('stored_verdicts', reason=reason)
+                return reason not in self.KEEP_REASONS
+
+        reason = self.check_listing(title, link, price, excluded_listings, listing.model, screened)
+
+        # Failed fetches and manual exclusions are re-evaluated on every run
+        if self.verdicts is not None and reason not in ('unverified', 'manual'):
+            self.verdicts.put(listing_id, listing_fingerprint, reason)
+
+        return reason not in self.KEEP_REASONS
+
+    def verify_rows(self, rows, excluded_listings, workers=1, mode='thread', on_verdict=None):
+        """Check every row and return the verdicts in input order
+
+        With workers > 1 the listing pages are fetched concurrently, either from a
+        thread pool (mode='thread') or from an asyncio event loop (mode='asyncio').
+        All workers share self.rate_limiter, so the request rate stays the same.
+        The whole batch is prescreened first: only the rows it cannot decide are fetched.
+        `on_verdict(row, excluded)` is called as each row is done, in completion order.
+        """
+        total = len(rows)
+        processed = 0
+        progress_lock = threading.Lock()
+        items = list(zip(rows, self.prescreen([Listing.of(row) for row in rows], excluded_listings)))
+
+        def check(item):
+            nonlocal processed
+            row, reason = item
+            verdict = True if reason is not None else self.check_row(row, excluded_listings, screened=True)
+            with progress_lock:
+                processed += 1
+                print(f"📊 Progress: {processed}/{total} listings")
+                if on_verdict:
+                    on_verdict(row, verdict)
+            return verdict
+
+        if workers <= 1:
+            return [check(item) for item in items]
+
+        if mode == 'thread':
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(check, items))
+
+        if mode == 'asyncio':
+            async def check_all():
+                loop = asyncio.get_running_loop()
+                limit = asyncio.Semaphore(workers)
+
+                async def check_async(item):
+                    async with limit:
+                        return await loop.run_in_executor(executor, check, item)
+
+                return await asyncio.gather(*(check_async(item) for item in items))
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return asyncio.run(check_all())
+
+        raise ValueError(f"Unknown worker mode: {mode}")
+
+    def iter_filter(self, rows, excluded_listings=None, workers=8):
+        """Verify rows as they arrive, yielding (row, excluded) in input order
+
+        `rows` may be any iterable. At most 2 * workers rows are in flight, so memory
+        stays flat.
+        """
+        return self.iter_filter_batches(([row] for row in rows), excluded_listings, workers)
+
+    def iter_filter_batches(self, batches, excluded_listings=None, workers=8):
+        """Like iter_filter for an iterable of row lists, e.g. the pages of OLXScraper.iter_many
+
+        Each batch is prescreened as a whole; only its undecided rows are queued for a
+        listing page check.
+        """
+        window = collections.deque()
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for batch in batches:
+                listings = [Listing.of(row) for row in batch]
+                for row, listing, reason in zip(batch, listings, self.prescreen(listings, excluded_listings)):
+                    if reason is not None:
+                        future = Future()
+                        future.set_result(True)
+                    else:
+                        future = executor.submit(self.check_row, listing, excluded_listings, True)
+                    window.append((row, future))
+                    while window and (len(window) >= 2 * workers or window[0][1].done()):
+                        head, future = window.popleft()
+                        yield head, future.result()
+
+            while window:
+                head, future = window.popleft()
+                yield head, future.result()
+
+    def load_excluded_listings(self, filename='excluded_listings.json'):
+        """Load the permanently excluded listing IDs"""
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def filter_listings(self, input_file, output_file, max_listings=None, workers=1, mode='thread', resume=False,
+                        checkpoint_file='filter_checkpoint.jsonl'):
+        """Filter listings from CSV file
+
+        Verdicts are checkpointed to `checkpoint_file` as they come in. With resume=True,
+        rows verified by an interrupted run (same title, price and rules) are not checked again.
+        """
         filtered_listings = []
         excluded_count = 0
 
         # Load permanently excluded listings
-        excluded_listings = {}
-        try:
-            with open('excluded_listings.json', 'r', encoding='utf-8') as f:
-                excluded_listings = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            excluded_listings = {}
+        excluded_listings = self.load_excluded_listings()
 
         try:
             with open(input_file, 'r', encoding='utf-8') as csvfile:
                 reader = csv.DictReader(csvfile)
-                all_rows = list(reader)
+                all_rows = [Listing.from_dict(row) for row in reader]
                 total_listings = len(all_rows)
-
-                if max_listings:
-                    all_rows = all_rows[:max_listings]
-                    print(f"🔍 Processing first {max_listings} listings for testing...")
-
-                processed = 0
-                for row in all_rows:
-                    processed += 1
-                    title = row.get('title', '')
-                    link = row.get('link', '')
-
-                    print(f"📊 Progress: {processed}/{len(all_rows)} listings")
-
-                    if not title or not link:
-                        continue
-
-                    price = row.get('price', '')
-                    if self.should_exclude_listing(title, link, price, excluded_listings):
-                        excluded_count += 1
-                    else:
-                        filtered_listings.append(row)
-
-                    # Add small delay between requests to be respectful
-                    time.sleep(0.5)
-
         except FileNotFoundError:
             print(f"❌ Input file '{input_file}' not found")
             return []
 
+        if max_listings:
+            all_rows = all_rows[:max_listings]
+            print(f"🔍 Processing first {max_listings} listings for testing...")
+
+        if workers > 1:
+            print(f"⚡ Verifying with {workers} {mode} workers")
+
+        checkpoint = FilterCheckpoint(checkpoint_file)
+        if not resume:
+            checkpoint.clear()
+        completed = checkpoint.load()
+        rules = self.rules_fingerprint()
+
+        def row_fingerprint(row):
+            return fingerprint(row.title or '', row.price or '', rules)
+
+        verdicts = [None] * len(all_rows)
+        pending = []
+        for i, row in enumerate(all_rows):
+            entry = completed.get(row.listing_id)
+            if entry and entry[0] == row_fingerprint(row):
+                verdicts[i] = entry[1]
+            else:
+                pending.append(i)
+        if resume:
+            print(f"⏯️  Resuming: {len(all_rows) - len(pending)} listings already verified, {len(pending)} to go")
+
+        def on_verdict(row, excluded):
+            # Stored verdicts are committed with each checkpoint, so both survive a kill
+            if checkpoint.record(row.listing_id, row_fingerprint(row), excluded) and self.verdicts is not None:
+                self.verdicts.save()
+
+        # Verdicts come back in input order, so the output is the same as a serial run
+        results = self.verify_rows([all_rows[i] for i in pending], excluded_listings, workers, mode, on_verdict)
+        for i, excluded in zip(pending, results):
+            verdicts[i] = excluded
+        checkpoint.flush()
+        if self.cache:
+            self.cache.flush()
+            print(f"🗄️  Page cache: {self.cache.summary()}")
+        if self.verdicts is not None:
+            self.verdicts.save()
+            print(f"♻️  Reused {self.verdicts.hits} stored verdicts")
+        for row, excluded in zip(all_rows, verdicts):
+            if excluded is None:
+                continue
+            if excluded:
+                excluded_count += 1
+            else:
+                filtered_listings.append(row)
+
         print(f"\n📊 Filtering Summary:")
         print(f"   Total listings: {total_listings}")
         print(f"   Excluded (no defects): {excluded_count}")
         print(f"   Kept (with defects): {len(filtered_listings)}")
 
-        # Save filtered results
+        # Save filtered results (written to a temporary file and moved into place)
         if filtered_listings:
-            fieldnames = ['title', 'price', 'location', 'date', 'link']
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(filtered_listings)
+            with CSVListingWriter(output_file) as writer:
+                for listing in filtered_listings:
+                    writer.write(listing.to_dict())
 
             print(f"💾 Saved {len(filtered_listings)} filtered listings to {output_file}")
 
+        # The run is complete: the next one starts from the first row
+        checkpoint.clear()
         return filtered_listings
 
 def main():
-    import sys
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Filter OLX listings down to actual defect listings")
+    parser.add_argument('max_listings', nargs='?', type=int, help="only process the first N listings (testing)")
+    parser.add_argument('--workers', type=int, default=8, help="number of listings verified at once (default: 8)")
+    parser.add_argument('--mode', choices=['thread', 'asyncio'], default='thread', help="worker pool type")
+    parser.add_argument('--rate', type=float, default=2.0, help="max listing page requests per second")
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4', help="HTML extraction backend")
+    parser.add_argument('--parser-workers', type=int, default=0,
+                        help="parse listing pages in this many worker processes (default: 0, in the fetching threads)")
+    parser.add_argument('--trust-listing-prices', action='store_true',
+                        help="apply the price limits to the scraped price, without fetching those listing pages")
+    parser.add_argument('--resume', action='store_true',
+                        help="skip the listings an interrupted run already verified (filter_checkpoint.jsonl)")
+    parser.add_argument('--metrics-file', default='run_metrics.json', help="JSON metrics of this run")
+    parser.add_argument('--prometheus-file', help="also write the metrics as a Prometheus textfile")
+    args = parser.parse_args()
 
     # Check for command line argument for testing
-    max_listings = None
-    if len(sys.argv) > 1:
-        try:
-            max_listings = int(sys.argv[1])
-            print(f"🧪 Testing mode: processing first {max_listings} listings")
-        except ValueError:
-            print("Usage: python filter_defect_listings.py [max_listings]")
-            return
+    max_listings = args.max_listings
+    if max_listings:
+        print(f"🧪 Testing mode: processing first {max_listings} listings")
 
     # Filter the xbox defect listings
     input_file = 'olx_listings.csv'
@@ -438,8 +652,25 @@ def main():
     print(f"Output: {output_file}")
     print("-" * 50)
 
-    filter = OLXDefectFilter()
-    filtered_listings = filter.filter_listings(input_file, output_file, max_listings)
+    from storage import ListingStore, SQLiteVerdictStore
+    from parse_workers import ParserPool
+
+    # Worker processes are started before any fetching thread
+    parser_pool = ParserPool(args.parser_workers, args.parser) if args.parser_workers > 0 else None
+    store = ListingStore()
+    filter = OLXDefectFilter(requests_per_second=args.rate, cache=HTTPCache(), verdicts=SQLiteVerdictStore(store),
+                             parser_backend=args.parser, parser_pool=parser_pool,
+                             transport=Transport(pool_size=args.workers))
+    filter.trust_listing_prices = args.trust_listing_prices
+    try:
+        filtered_listings = filter.filter_listings(input_file, output_file, max_listings, args.workers, args.mode,
+                                                   args.resume)
+    finally:
+        if parser_pool:
+            parser_pool.close()
+    store.close()
+    filter.metrics.save(args.metrics_file, args.prometheus_file)
+    print(f"🌐 Transport: {filter.transport.summary()}")
 
     if filtered_listings:
         print(f"\n✅ Success! Filtered {len(filtered_listings)} listings with actual defects.")
@@ -0,0 +1,185 @@
+"""
+On-disk HTTP response cache with conditional revalidation (ETag / Last-Modified)
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+LISTING_ID_PATTERN = re.compile(r'-ID([a-zA-Z0-9]+)\.html')
+
+
+def cache_key(url):
+    """Return the cache key for a URL: the listing ID for listing pages, a URL hash otherwise"""
+    match = LISTING_ID_PATTERN.search(url)
+    if match:
+        # The same listing is linked with different ?search_reason=... suffixes
+        return f"listing-{match.group(1)}"
+    return "url-" + hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+class HTTPCache:
+    """Cache of page bodies keyed by listing ID, bounded in size with LRU eviction
+
+    Entries younger than their TTL are served without any request. Older entries
+    are revalidated with If-None-Match / If-Modified-Since, so an unchanged page
+    costs a 304 instead of a full download.
+    """
+
+    INDEX_FILE = 'index.json'
+
+    def __init__(self, directory='.http_cache', listing_ttl=2 * 3600, search_ttl=0, max_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.listing_ttl = listing_ttl
+        self.search_ttl = search_ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+
+        os.makedirs(directory, exist_ok=True)
+        self.index = self._load_index()
+        atexit.register(self.flush)
+
+    def _index_path(self):
+        return os.path.join(self.directory, self.INDEX_FILE)
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, key + '.html')
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _ttl(self, key):
+        return self.listing_ttl if key.startswith('listing-') else self.search_ttl
+
+    def _read_body(self, key):
+        try:
+            with open(self._body_path(key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def get_fresh(self, url):
+        """Return the cached body if it is still within its TTL, otherwise None"""
+        key = cache_key(url)
+        with self._lock:
+            entry = self.index.get(key)
+            if not entry or time.time() - entry['stored_at'] >= self._ttl(key):
+                return None
+            entry['last_access'] = time.time()
+            self._dirty = True
+
+        body = self._read_body(key)
+        if body is not None:
+            with self._lock:
+                self.hits += 1
+        return body
+
+    def fetch(self, session, url, timeout=10):
+        """GET a URL through the cache, revalidating stale entries with a conditional request"""
+        key = cache_key(url)
+        with self._lock:
+            entry = dict(self.index.get(key) or {})
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(url, timeout=timeout, headers=headers)
+        if response.status_code == 304 and entry:
+            body = self._read_body(key)
+            if body is not None:
+                self._touch(key, stored=True)
+                return body
+            # The body went missing on disk, fetch it again unconditionally
+            response = session.get(url, timeout=timeout)
+
+        response.raise_for_status()
+        with self._lock:
+            self.misses += 1
+        self.store(url, response.text, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.text
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Write a response body to disk and record its validators"""
+        key = cache_key(url)
+        data = body.encode('utf-8')
+        # Unique per process and thread: queue workers in several processes may store the same listing
+        tmp_path = self._body_path(key) + f'.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._body_path(key))
+
+        now = time.time()
+        with self._lock:
+            self.index[key] = {
+                'url': url,
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': now,
+                'last_access': now,
+                'size': len(data)
+            }
+            self._dirty = True
+            self._evict()
+
+    def _touch(self, key, stored=False):
+        with self._lock:
+            entry = self.index.get(key)
+            if entry:
+                entry['last_access'] = time.time()
+                if stored:
+                    entry['stored_at'] = entry['last_access']
+                    self.revalidated += 1
+                self._dirty = True
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        total = sum(entry['size'] for entry in self.index.values())
+        if total <= self.max_bytes:
+            return
+
+        for key, entry in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+            if total <= self.max_bytes:
+                break
+            total -= entry['size']
+            del self.index[key]
+            try:
+                os.remove(self._body_path(key))
+            except FileNotFoundError:
+                pass
+
+    def flush(self):
+        """Persist the index, merging entries written by other processes since we loaded it"""
+        with self._lock:
+            if not self._dirty:
+                return
+            merged = self._load_index()
+            merged = {key: entry for key, entry in merged.items() if os.path.exists(self._body_path(key))}
+            merged.update(self.index)
+            self.index = merged
+            self._evict()
+
+            # One temporary file per process, so workers flushing at once do not clobber each other
+            tmp_path = f"{self._index_path()}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f)
+            os.replace(tmp_path, self._index_path())
+            self._dirty = False
+
+    def summary(self):
+        """Return a one-line description of cache effectiveness for this run"""
+        return f"{self.hits} fresh hits, {self.revalidated} revalidated (304), {self.misses} downloaded"
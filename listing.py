@@ -0,0 +1,115 @@
+"""
+Listing record shared by the scraper, the filter and the stores
+
+A Listing keeps the five scraped fields and what every stage derives from them,
+computed once when it is created: the listing ID, the price in bani/cents with its
+currency and the console model. Locations and currencies are interned, since a crawl
+repeats a few dozen of them thousands of times.
+"""
+
+import sys
+from http_cache import LISTING_ID_PATTERN
+from listing_writers import LISTING_FIELDS
+from text_matcher import RuleMatcher
+
+# Console models in priority order: Xbox, PlayStation, Nintendo Switch, most specific first
+MODEL_PRIORITY = [
+    "xbox series x", "xbox series s", "xbox one x", "xbox one s", "xbox one",
+    "ps5 digital", "ps5", "ps4 pro", "ps4 slim", "ps4",
+    "nintendo switch", "switch"
+]
+
+_model_matcher = RuleMatcher({'models': MODEL_PRIORITY})
+
+
+def get_listing_id(link):
+    """Extract listing ID from URL, falling back to the link itself"""
+    match = LISTING_ID_PATTERN.search(link)
+    return match.group(1) if match else link
+
+
+def parse_price(price_string):
+    """Return (amount in bani/cents, currency code) for a price such as "1.234,56 lei", or (None, None)"""
+    if not price_string or price_string == "N/A":
+        return None, None
+
+    lower = price_string.lower()
+    currency = 'EUR' if '€' in lower or 'eur' in lower else 'RON'
+    amount = lower.replace("lei", "").replace("ron", "").replace("€", "").replace("eur", "").strip()
+
+    # Handle Romanian number format (1.234,56)
+    amount = amount.replace(".", "").replace(",", ".")
+    try:
+        return int(round(float(amount) * 100)), currency
+    except ValueError:
+        return None, None
+
+
+def price_value(price_string):
+    """Numeric price (lei/euro) of a price string, or None"""
+    amount, _ = parse_price(price_string)
+    return None if amount is None else amount / 100
+
+
+def identify_model(title):
+    """Identify the console model from the title (Xbox, PS, Switch), or None"""
+    models = _model_matcher.match(title or '')['models']
+    return models[0] if models else None
+
+
+class Listing:
+    """One scraped listing; also readable like the dicts it replaces (listing['title'], listing.get('price'))"""
+
+    __slots__ = ('title', 'price', 'location', 'date', 'link', 'listing_id', 'price_minor', 'currency', 'model')
+
+    def __init__(self, title, price='N/A', location='N/A', date='N/A', link=''):
+        self.title = title
+        self.price = price
+        self.location = sys.intern(location) if location else location
+        self.date = date
+        self.link = link
+        self.listing_id = get_listing_id(link)
+        self.price_minor, self.currency = parse_price(price)
+        self.model = identify_model(title)
+
+    @classmethod
+    def from_dict(cls, data):
+        # csv.DictReader fills the columns missing from a short row with None
+        return cls(*(data.get(field) or '' for field in LISTING_FIELDS))
+
+    @classmethod
+    def of(cls, listing):
+        """Return a Listing unchanged, or build one from a dict (e.g. a CSV row)"""
+        return listing if isinstance(listing, cls) else cls.from_dict(listing)
+
+    @property
+    def price_value(self):
+        """Price as a number of lei/euro, or None"""
+        return None if self.price_minor is None else self.price_minor / 100
+
+    def to_dict(self):
+        """The scraped fields, as written to the JSON/CSV files"""
+        return {field: getattr(self, field) for field in LISTING_FIELDS}
+
+    def __getitem__(self, field):
+        if field not in LISTING_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in LISTING_FIELDS else None
+        return default if value is None else value
+
+    def __getstate__(self):
+        # A plain tuple: pickles (e.g. from parser worker processes) without any field names
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __eq__(self, other):
+        return isinstance(other, Listing) and self.__getstate__() == other.__getstate__()
+
+    def __repr__(self):
+        return f"Listing({self.listing_id!r}, {self.title!r}, {self.price!r})"
@@ -0,0 +1,82 @@
+"""
+Incremental JSON/CSV writers, so listings can be written as they are scraped
+"""
+
+import csv
+import json
+import os
+
+LISTING_FIELDS = ['title', 'price', 'location', 'date', 'link']
+
+
+class _IncrementalWriter:
+    """Writes to a temporary file and replaces the target on close
+
+    Readers (the website, the next pipeline stage) never see a half-written file.
+    If nothing was written, or the `with` block raised, the previous file is left untouched.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.tmp_filename = filename + '.tmp'
+        self.count = 0
+        self.file = open(self.tmp_filename, 'w', newline='', encoding='utf-8')
+
+    def write(self, listing):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+    def close(self):
+        if self.file.closed:
+            return
+        self._finish()
+        self.file.close()
+        if self.count:
+            os.replace(self.tmp_filename, self.filename)
+            print(f"Saved {self.count} listings to {self.filename}")
+        else:
+            os.remove(self.tmp_filename)
+
+    def discard(self):
+        """Drop what was written, keeping the previous file"""
+        if self.file.closed:
+            return
+        self.file.close()
+        os.remove(self.tmp_filename)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class JSONArrayWriter(_IncrementalWriter):
+    """Streams listings into a JSON array in the same format as OLXScraper.save_to_json"""
+
+    def write(self, listing):
+        self.file.write('[\n' if self.count == 0 else ',\n')
+        item = json.dumps(listing, ensure_ascii=False, indent=2)
+        self.file.write('  ' + item.replace('\n', '\n  '))
+        self.count += 1
+
+    def _finish(self):
+        self.file.write('\n]' if self.count else '[]')
+
+
+class CSVListingWriter(_IncrementalWriter):
+    """Streams listings into a CSV file with the standard listing columns"""
+
+    def __init__(self, filename, fieldnames=None):
+        super().__init__(filename)
+        self.writer = csv.DictWriter(self.file, fieldnames=fieldnames or LISTING_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, listing):
+        self.writer.writerow(listing)
+        self.count += 1
@@ -0,0 +1,369 @@
+"""
+Extraction backend on raw lxml.html trees with precompiled XPath selectors
+
+Mirrors the BeautifulSoup extractors in OLXScraper and OLXDefectFilter and must
+return identical results; benchmarks/check_parser_parity.py compares the two.
+The description locator also has a BeautifulSoup variant (locate_description_soup)
+for the bs4 backend, sharing the text-span helpers.
+"""
+
+import json
+import re
+from urllib.parse import urljoin
+from bs4 import CData, NavigableString, Tag
+from lxml import etree
+from listing import price_value
+
+# Text that BeautifulSoup's get_text() leaves out: script/style/template contents and ruby annotations
+_SKIPPED_TAGS = ('script', 'style', 'template', 'rt', 'rp')
+_TEXT = etree.XPath('.//text()[not(ancestor::script or ancestor::style or ancestor::template'
+                    ' or ancestor::rt or ancestor::rp)]')
+
+# Blocks mentioning these are contact boxes, not the description
+DESCRIPTION_SKIP_WORDS = ('telefon', 'email', 'contact')
+
+
+def _xpath(expression):
+    return etree.XPath(expression)
+
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+# (CSS selector as used by the BeautifulSoup path, equivalent XPath)
+LISTING_SELECTORS = [
+    ('table#offers_table tbody tr', _xpath("//table[@id='offers_table']//tbody//tr")),
+    ('div[data-cy="l-card"]', _xpath("//div[@data-cy='l-card']")),
+    ('.offer-wrapper', _xpath(f"//*[{_has_class('offer-wrapper')}]")),
+    ('.listing-item', _xpath(f"//*[{_has_class('listing-item')}]")),
+    ('div.offer', _xpath(f"//div[{_has_class('offer')}]")),
+    ('article[data-cy="ad-card"]', _xpath("//article[@data-cy='ad-card']")),
+    ('.css-1sw7q4x', _xpath(f"//*[{_has_class('css-1sw7q4x')}]"))
+]
+
+PAGINATION_SELECTORS = [
+    _xpath("//a[@data-cy='pagination-forward']"),
+    _xpath(f"//*[{_has_class('pagination')}]//a[{_has_class('next')}]"),
+    _xpath(f"//a[{_has_class('next')}]"),
+    _xpath("//a[normalize-space(@rel)='next']"),
+    _xpath("//link[normalize-space(@rel)='next']")
+]
+
+PRICE_SELECTORS = [
+    _xpath("//h3[@data-testid='ad-price']"),
+    _xpath("//*[@data-cy='ad-price']"),
+    _xpath(f"//*[{_has_class('css-1q7gvpp')}]"),
+    _xpath(f"//*[{_has_class('css-1hgk2z')}]"),
+    _xpath(f"//*[{_has_class('ad-price')}]"),
+    _xpath(f"//*[{_has_class('price')}]")
+]
+
+DESCRIPTION_SELECTORS = [
+    _xpath("//div[@data-cy='ad-description']"),
+    _xpath(f"//*[{_has_class('description')}]"),
+    _xpath(f"//*[{_has_class('ad-description')}]"),
+    _xpath("//*[@data-testid='ad-description']"),
+    _xpath(f"//*[{_has_class('css-1t8sg8s')}]"),
+    _xpath(f"//*[{_has_class('clr-text-sm')}]")
+]
+
+_CARD_LINK = _xpath(".//a[@href]")
+_CARD_HEADING = _xpath(".//*[self::h3 or self::h4 or self::h5 or self::h6]")
+_CARD_FIELDS = _xpath(".//*[(self::span or self::div or self::p) and @class]")
+_ALL_LINKS = _xpath("//a[@href]")
+_JSON_LD = _xpath("//script[@type='application/ld+json']")
+
+_PRICE_CLASS = re.compile(r'(price|pret)', re.I)
+_LOCATION_CLASS = re.compile(r'(location|locatie|city|oras)', re.I)
+_DATE_CLASS = re.compile(r'(date|data|time|timp)', re.I)
+_LISTING_HREF = re.compile(r'/oferta/|/d/oferta/')
+_PRICE_TEXT = re.compile(r'(\d+(?:\.\d{3})*(?:,\d{2})?)\s*(lei|€|eur|ron)', re.I)
+
+
+def get_text(element, strip=False):
+    """Equivalent of BeautifulSoup's element.get_text() / get_text(strip=True)"""
+    strings = _TEXT(element)
+    if strip:
+        return ''.join(text.strip() for text in strings if text.strip())
+    return ''.join(strings)
+
+
+def _first(xpath, root):
+    found = xpath(root)
+    return found[0] if found else None
+
+
+def _first_with_class(card, pattern):
+    """First span/div/p descendant whose class attribute matches the pattern"""
+    for element in _CARD_FIELDS(card):
+        if pattern.search(' '.join(element.get('class').split())):
+            return element
+    return None
+
+
+def parse_listing(card, canonicalize_link):
+    """Extract data from a single listing element"""
+    try:
+        link_element = _first(_CARD_LINK, card)
+        if link_element is None:
+            return None
+
+        link = link_element.get('href')
+        # Make sure it's an absolute URL
+        if not link.startswith('http'):
+            link = urljoin('https://www.olx.ro', link)
+        link = canonicalize_link(link)
+
+        title = link_element.get('title') or get_text(link_element, strip=True)
+        if not title:
+            title_element = _first(_CARD_HEADING, card)
+            title = get_text(title_element, strip=True) if title_element is not None else "No title"
+
+        price = "N/A"
+        price_element = _first_with_class(card, _PRICE_CLASS)
+        if price_element is not None:
+            price = get_text(price_element, strip=True)
+        else:
+            # Find all price matches and select the highest value one
+            prices_with_values = []
+            for price_str, currency in _PRICE_TEXT.findall(get_text(card)):
+                prices_with_values.append((price_value(price_str), f"{price_str} {currency}"))
+            if prices_with_values:
+                prices_with_values.sort(key=lambda x: x[0], reverse=True)
+                price = prices_with_values[0][1]
+
+        location = "N/A"
+        location_element = _first_with_class(card, _LOCATION_CLASS)
+        if location_element is not None:
+            location = get_text(location_element, strip=True)
+
+        date = "N/A"
+        date_element = _first_with_class(card, _DATE_CLASS)
+        if date_element is not None:
+            date = get_text(date_element, strip=True)
+
+        return {
+            'title': title,
+            'price': price,
+            'location': location,
+            'date': date,
+            'link': link
+        }
+    except Exception as e:
+        print(f"Error parsing listing: {e}")
+        return None
+
+
+def get_listings(tree, base_url, canonicalize_link):
+    """Extract all listings from a search page tree; returns (listings, selector that matched)"""
+    listings = []
+
+    for selector, xpath in LISTING_SELECTORS:
+        cards = xpath(tree)
+        if cards:
+            print(f"Found {len(cards)} listings using selector: {selector}")
+            for card in cards:
+                listing_data = parse_listing(card, canonicalize_link)
+                if listing_data:
+                    listings.append(listing_data)
+            return listings, selector
+
+    # If no specific selectors work, try to find all links that look like listing URLs
+    print("No standard selectors worked, trying to find listing links...")
+    for link in _ALL_LINKS(tree):
+        href = link.get('href')
+        if not _LISTING_HREF.search(href):
+            continue
+        if not href.startswith('http'):
+            href = urljoin(base_url, href)
+        href = canonicalize_link(href)
+
+        title = link.get('title') or get_text(link, strip=True)
+        if title and len(title) > 10:  # Filter out very short titles
+            listings.append({
+                'title': title,
+                'price': 'N/A',
+                'location': 'N/A',
+                'date': 'N/A',
+                'link': href
+            })
+
+    return listings, 'listing links'
+
+
+def get_next_link(tree, base_url):
+    """Return the next page URL from the pagination links, or None"""
+    for xpath in PAGINATION_SELECTORS:
+        next_link = _first(xpath, tree)
+        if next_link is not None:
+            href = next_link.get('href')
+            if href:
+                return urljoin(base_url, href)
+    return None
+
+
+def extract_price(tree):
+    """Extract the most accurate price from a listing page tree (see OLXDefectFilter.extract_price_from_page)"""
+    for xpath in PRICE_SELECTORS:
+        price_elem = _first(xpath, tree)
+        if price_elem is not None:
+            price_match = _PRICE_TEXT.search(get_text(price_elem, strip=True))
+            if price_match:
+                price_str, currency = price_match.groups()
+                if 10 <= price_value(price_str) <= 10000:  # Reasonable range check
+                    final_price = f"{price_str} {currency}"
+                    print(f"  Found price in OLX element: {final_price}")
+                    return final_price
+
+    # Fallback: Look for structured data (JSON-LD)
+    for script in _JSON_LD(tree):
+        try:
+            data = json.loads(script.text)
+            if isinstance(data, dict) and 'offers' in data:
+                offers = data['offers']
+                if isinstance(offers, dict) and 'price' in offers:
+                    price_val = offers['price']
+                    currency = offers.get('priceCurrency', 'lei')
+                    try:
+                        numeric_value = float(price_val)
+                        if 10 <= numeric_value <= 10000:
+                            final_price = f"{int(numeric_value)} {currency.lower()}"
+                            print(f"  Found price in structured data: {final_price}")
+                            return final_price
+                    except (ValueError, TypeError):
+                        continue
+        except (json.JSONDecodeError, TypeError):
+            continue
+
+    return None
+
+
+def page_text(tree):
+    """Equivalent of soup.get_text() for the whole document"""
+    return get_text(tree)
+
+
+def extract_description(tree):
+    """Extract the description from a listing page tree (see OLXDefectFilter.extract_description)"""
+    for xpath in DESCRIPTION_SELECTORS:
+        desc_element = _first(xpath, tree)
+        if desc_element is not None:
+            description = get_text(desc_element, strip=True)
+            if description and len(description) > 20:  # Filter out very short texts
+                return description
+
+    # Fallback: the div that looks most like a block of prose
+    div = locate_description(tree)
+    return get_text(div, strip=True) if div is not None else ""
+
+
+_EDGE = max(len(word) for word in DESCRIPTION_SKIP_WORDS) - 1
+# The string types Tag.get_text() returns (not comments, scripts, stylesheets, ...)
+_SOUP_TEXT_TYPES = (NavigableString, CData)
+_NO_TEXT = (0, False, '', '')
+
+
+def _text_span(text):
+    """Summarize a string as (stripped length, has skip word, first and last few lowercase chars)
+
+    Only the edges are kept, enough to find skip words that span two strings when
+    they are joined, so spans combine in O(1).
+    """
+    if not text:
+        return _NO_TEXT
+    text = text.strip()
+    if not text:
+        return _NO_TEXT
+    lower = text.lower()
+    return len(text), any(word in lower for word in DESCRIPTION_SKIP_WORDS), lower[:_EDGE], lower[-_EDGE:]
+
+
+def _join_spans(first, second):
+    """Span of the two texts concatenated"""
+    if not second[0]:
+        return first
+    if not first[0]:
+        return second
+    joint = first[3] + second[2]
+    return (
+        first[0] + second[0],
+        first[1] or second[1] or any(word in joint for word in DESCRIPTION_SKIP_WORDS),
+        first[2] if len(first[2]) == _EDGE else (first[2] + second[2])[:_EDGE],
+        (first[3] + second[3])[-_EDGE:]
+    )
+
+
+def locate_description(tree):
+    """Find the description block among all divs in one bottom-up pass over the tree
+
+    For every element the length of its get_text(strip=True), how much of it is link
+    text and whether it contains a skip word are combined from its children, so each
+    text node is visited once. A div qualifies like in the old scan (over 100 characters,
+    no 'telefon'/'email'/'contact'); among those the one with the most text outside
+    links, weighted by the share of its text outside links, wins. Menus and lists of
+    similar ads are mostly links, so the block of prose beats them.
+    """
+    best, best_score = None, 0
+    # One frame per open element: [span of its text so far, length of its link text]
+    stack = [[_NO_TEXT, 0]]
+    for event, element in etree.iterwalk(tree, events=('start', 'end', 'comment', 'pi')):
+        if event == 'start':
+            stack.append(None if element.tag in _SKIPPED_TAGS else [_text_span(element.text), 0])
+            continue
+
+        if event == 'end':
+            frame = stack.pop()
+            if frame is not None:
+                span, link_length = frame
+                tag = element.tag
+                if tag == 'a':
+                    link_length = span[0]
+                elif tag == 'div' and span[0] > 100 and not span[1]:
+                    prose = span[0] - link_length
+                    score = prose * prose / span[0]
+                    if score > best_score:
+                        best, best_score = element, score
+                parent = stack[-1]
+                if parent is not None:
+                    parent[0] = _join_spans(parent[0], span)
+                    parent[1] += link_length
+
+        # The tail of an element (or comment) is text of its parent
+        parent = stack[-1]
+        if parent is not None and element.tail:
+            parent[0] = _join_spans(parent[0], _text_span(element.tail))
+    return best
+
+
+def locate_description_soup(soup):
+    """locate_description over a BeautifulSoup tree, for the bs4 backend (no second parse)
+
+    The same bottom-up pass and scoring; text counts as in Tag.get_text, which skips
+    comments and the strings of script, style, template, rt and rp elements.
+    """
+    best, best_score = None, 0
+    # One entry per open element: (element, iterator over its children, [span of its text, link text length])
+    stack = [(soup, iter(soup.children), [_NO_TEXT, 0])]
+    while True:
+        element, children, frame = stack[-1]
+        child = next(children, None)
+        if child is None:
+            if len(stack) == 1:
+                return best
+            stack.pop()
+            span, link_length = frame
+            if element.name == 'a':
+                link_length = span[0]
+            elif element.name == 'div' and span[0] > 100 and not span[1]:
+                prose = span[0] - link_length
+                score = prose * prose / span[0]
+                if score > best_score:
+                    best, best_score = element, score
+            parent = stack[-1][2]
+            parent[0] = _join_spans(parent[0], span)
+            parent[1] += link_length
+        elif isinstance(child, Tag):
+            stack.append((child, iter(child.children), [_NO_TEXT, 0]))
+        elif type(child) in _SOUP_TEXT_TYPES:
+            frame[0] = _join_spans(frame[0], _text_span(child))
@@ -1,31 +1,127 @@
-import requests
-from bs4 import BeautifulSoup
 import json
 import time
 from urllib.parse import urljoin, urlparse
 import re
+import asyncio
+import functools
+import queue
+import threading
+from fetch_engine import AsyncFetchEngine, AdaptiveRateLimiter
+from transport import Transport
+from http_cache import HTTPCache
+from parsed_page import ParsedPage
+import lxml_extract
+import embedded_data
+from run_metrics import RunMetrics
+from listing import Listing, price_value
+from storage import ListingStore
+
+
+def search_url(term):
+    """OLX search URL of a search term; URLs are returned as they are"""
+    if '://' in term:
+        return term
+    return f"https://www.olx.ro/oferte/q-{term.replace(' ', '-').lower()}/"
+
+
+def _page_limit(max_pages, url):
+    """Pages to crawl for a search: `max_pages` is a number, or {search URL: number}"""
+    return max_pages.get(url, 0) if isinstance(max_pages, dict) else max_pages
+
 
 class OLXScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        # Set a user agent to avoid being blocked
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-
-    def get_page(self, url, max_retries=3):
-        """Fetch a page with retry logic"""
-        for attempt in range(max_retries):
-            try:
-                response = self.session.get(url, timeout=10)
-                response.raise_for_status()
-                return response.text
-            except requests.RequestException as e:
-                print(f"Attempt {attempt + 1} failed: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2 ** attempt)  # Exponential backoff
-                else:
-                    raise e
+    def __init__(self, max_concurrency=4, requests_per_second=1.0, cache=None, known_ids=None, stop_known_share=0.8,
+                 parser_backend='bs4', structured_data=True, metrics=None, rate_limiter=None, parser_pool=None,
+                 transport=None):
+        # Pooled HTTP session with a keep-alive connection per concurrent request.
+        # Pass one Transport to share its connections with the filter.
+        self.transport = transport or Transport(pool_size=max_concurrency)
+
+        # Adaptive pacing: up to `requests_per_second`, slower while the site throttles us.
+        # Pass one AdaptiveRateLimiter to share it with the filter.
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter(max_rate=requests_per_second)
+
+        # Concurrent fetching: at most `max_concurrency` requests in flight per host,
+        # all started through the rate limiter (so get_page does not wait for it again)
+        self.fetch_engine = AsyncFetchEngine(
+            functools.partial(self.get_page, paced=True),
+            max_per_host=max_concurrency,
+            budget=self.rate_limiter
+        )
+
+        # Optional HTTPCache shared across runs (conditional GETs for unchanged pages)
+        self.cache = cache
+
+        # Listing IDs already returned in this run, shared by all searches
+        self.reset_seen()
+
+        # Incremental mode: stop paging once `stop_known_share` of a page was seen in earlier runs
+        self.known_ids = known_ids
+        self.stop_known_share = stop_known_share
+
+        # 'bs4' (BeautifulSoup) or 'lxml' (raw lxml tree with precompiled XPath, same results)
+        if parser_backend not in ('bs4', 'lxml'):
+            raise ValueError(f"Unknown parser backend: {parser_backend}")
+        self.parser_backend = parser_backend
+
+        # Read search results from the page's embedded app state / JSON-LD, parsing the DOM only as a fallback
+        self.structured_data = structured_data
+
+        # Fetch, parse and selector metrics; pass one RunMetrics to share it with the filter
+        self.metrics = metrics or RunMetrics()
+
+        # Optional parse_workers.ParserPool: search pages are parsed in worker processes
+        self.parser_pool = parser_pool
+
+    def get_page(self, url, max_retries=3, paced=False):
+        """Fetch a page with retry logic
+
+        Every request waits for the rate limiter, except the first one with paced=True
+        (the caller, e.g. the fetch engine, already waited).
+        """
+        return self.transport.fetch(url, 'search', self.rate_limiter, self.metrics, self.cache, max_retries,
+                                    paced=paced)
+
+    def canonicalize_link(self, link):
+        """Strip the query string and fragment, e.g. ?search_reason=search%7Cpromoted"""
+        parsed = urlparse(link)
+        return f"{parsed.scheme}://{parsed.netloc}{parsed.path}"
+
+    def newest_first_url(self, search_url):
+        """Return the search URL with results ordered newest first"""
+        separator = '&' if urlparse(search_url).query else '?'
+        return search_url + separator + 'search%5Border%5D=created_at%3Adesc'
+
+    def known_share(self, listings):
+        """Fraction of the listings already seen in previous runs"""
+        if not listings or not self.known_ids:
+            return 0.0
+        known = sum(1 for listing in listings if listing.listing_id in self.known_ids)
+        return known / len(listings)
+
+    def reset_seen(self):
+        """Forget the listings seen so far and reset the dedup and per-search counters"""
+        self.seen_ids = set()
+        self.dedup_stats = {'unique': 0, 'duplicates': 0}
+        # Search URL -> pages that returned listings; searches with a page that failed to load
+        self.search_pages = {}
+        self.failed_searches = set()
+
+    def crawl_succeeded(self, search_url):
+        """True if the search returned listings in the last crawl and none of its pages failed"""
+        return self.search_pages.get(search_url, 0) > 0 and search_url not in self.failed_searches
+
+    def drop_duplicates(self, listings):
+        """Return the listings whose listing ID has not been seen yet in this run"""
+        unique = []
+        for listing in listings:
+            if listing.listing_id in self.seen_ids:
+                self.dedup_stats['duplicates'] += 1
+                continue
+            self.seen_ids.add(listing.listing_id)
+            unique.append(listing)
+        self.dedup_stats['unique'] += len(unique)
+        return unique
 
     def parse_listing(self, listing_element):
         """Extract data from a single listing element"""
@@ -39,6 +135,7 @@ class OLXScraper:
             # Make sure it's an absolute URL
             if not link.startswith('http'):
                 link = urljoin('https://www.olx.ro', link)
+            link = self.canonicalize_link(link)
 
             # Find title (usually in the link or a nearby element)
             title = link_element.get('title') or link_element.get_text(strip=True)
@@ -62,13 +159,7 @@ class OLXScraper:
                     prices_with_values = []
                     for match in price_matches:
                         price_str, currency = match
-                        try:
-                            # Convert Romanian format (1.234,56) to float
-                            numeric_str = price_str.replace('.', '').replace(',', '.')
-                            numeric_value = float(numeric_str)
-                            prices_with_values.append((numeric_value, f"{price_str} {currency}"))
-                        except ValueError:
-                            continue
+                        prices_with_values.append((price_value(price_str), f"{price_str} {currency}"))
 
                     if prices_with_values:
                         # Select the highest price value
@@ -99,8 +190,13 @@ class OLXScraper:
             return None
 
     def get_listings_from_page(self, html_content, base_url):
-        """Extract all listings from a page"""
-        soup = BeautifulSoup(html_content, 'lxml')
+        """Extract all listings from a page (raw HTML or a ParsedPage)"""
+        page = ParsedPage.of(html_content, base_url)
+        if self.parser_backend == 'lxml':
+            listings, selector = lxml_extract.get_listings(page.tree, base_url, self.canonicalize_link)
+            self.metrics.count('selector_matched', selector=selector)
+            return listings
+        soup = page.soup
         listings = []
 
         # Common selectors for OLX listings - try multiple patterns
@@ -119,6 +215,7 @@ class OLXScraper:
             listing_elements = soup.select(selector)
             if listing_elements:
                 print(f"Found {len(listing_elements)} listings using selector: {selector}")
+                self.metrics.count('selector_matched', selector=selector)
                 found_listings = True
 
                 for element in listing_elements:
@@ -130,11 +227,13 @@ class OLXScraper:
         # If no specific selectors work, try to find all links that look like listing URLs
         if not found_listings:
             print("No standard selectors worked, trying to find listing links...")
+            self.metrics.count('selector_matched', selector='listing links')
             all_links = soup.find_all('a', href=re.compile(r'/oferta/|/d/oferta/'))
             for link in all_links:
                 href = link['href']
                 if not href.startswith('http'):
                     href = urljoin(base_url, href)
+                href = self.canonicalize_link(href)
 
                 title = link.get('title') or link.get_text(strip=True)
                 if title and len(title) > 10:  # Filter out very short titles
@@ -149,25 +248,33 @@ class OLXScraper:
         return listings
 
     def get_next_page_url(self, html_content, base_url):
-        """Find the next page URL for pagination"""
-        soup = BeautifulSoup(html_content, 'lxml')
-
-        # Look for pagination links
-        pagination_selectors = [
-            'a[data-cy="pagination-forward"]',
-            '.pagination a.next',
-            'a.next',
-            'a[rel="next"]',
-            'link[rel="next"]'
-        ]
-
-        for selector in pagination_selectors:
-            next_link = soup.select_one(selector)
-            if next_link:
-                href = next_link.get('href')
-                if href:
-                    return urljoin(base_url, href)
-
+        """Find the next page URL for pagination (raw HTML or a ParsedPage)"""
+        page = ParsedPage.of(html_content, base_url)
+        if self.parser_backend == 'lxml':
+            next_page_url = lxml_extract.get_next_link(page.tree, base_url)
+            if next_page_url:
+                return next_page_url
+        else:
+            # Look for pagination links
+            pagination_selectors = [
+                'a[data-cy="pagination-forward"]',
+                '.pagination a.next',
+                'a.next',
+                'a[rel="next"]',
+                'link[rel="next"]'
+            ]
+
+            for selector in pagination_selectors:
+                next_link = page.soup.select_one(selector)
+                if next_link:
+                    href = next_link.get('href')
+                    if href:
+                        return urljoin(base_url, href)
+
+        return self.increment_page_url(base_url)
+
+    def increment_page_url(self, base_url):
+        """Return the URL of the following page by incrementing (or adding) its page= parameter"""
         # Try to find pagination by looking for page=2, page=3, etc.
         current_url = urlparse(base_url)
         query_params = current_url.query
@@ -186,46 +293,158 @@ class OLXScraper:
 
         return None
 
+    def parse_search_page(self, html_content, url):
+        """Parse a search page once and return (listings as Listing records, next_page_url)"""
+        with self.metrics.timer('parse_seconds', page='search'):
+            page = ParsedPage.of(html_content, url)
+            if self.structured_data:
+                embedded = embedded_data.parse_search_page(page.html, url)
+                if embedded is not None:
+                    listings, has_next = embedded
+                    print(f"Found {len(listings)} listings in the page's embedded data")
+                    self.metrics.count('selector_matched', selector='embedded data')
+                    for listing in listings:
+                        listing['link'] = self.canonicalize_link(listing['link'])
+                    listings = [Listing.from_dict(listing) for listing in listings]
+                    if has_next is False:
+                        return listings, None
+                    return listings, self.increment_page_url(url)
+            listings = [Listing.from_dict(listing) for listing in self.get_listings_from_page(page, url)]
+            return listings, self.get_next_page_url(page, url)
+
     def scrape_search(self, search_url, max_pages=10):
         """Scrape all listings from a search URL"""
+        self.reset_seen()
+        return self.fetch_engine.run(self.scrape_search_async(search_url, max_pages))
+
+    async def scrape_search_async(self, search_url, max_pages=10):
+        """Scrape all listings from a search URL, pacing requests through the fetch engine"""
         all_listings = []
+        async for listings in self.iter_search_async(search_url, max_pages):
+            all_listings.extend(listings)
+        return all_listings
+
+    async def iter_search_async(self, search_url, max_pages=10):
+        """Yield the listings of a search page by page as they are fetched"""
         current_url = search_url
         page_count = 0
+        total = 0
 
         while current_url and page_count < max_pages:
             page_count += 1
             print(f"Scraping page {page_count}: {current_url}")
 
             try:
-                html_content = self.get_page(current_url)
-                listings = self.get_listings_from_page(html_content, current_url)
+                html_content = await self.fetch_engine.fetch_async(current_url)
+                if self.parser_pool is not None:
+                    # The event loop keeps fetching while a worker process parses the page
+                    listings, next_url = await self.parser_pool.parse_search_page_async(
+                        html_content, current_url, self.metrics
+                    )
+                else:
+                    listings, next_url = self.parse_search_page(html_content, current_url)
+            except Exception as e:
+                print(f"Error scraping page {page_count}: {e}")
+                self.failed_searches.add(search_url)
+                break
 
-                if not listings:
-                    print(f"No listings found on page {page_count}, stopping...")
+            if not listings:
+                print(f"No listings found on page {page_count}, stopping...")
+                break
+            self.search_pages[search_url] = self.search_pages.get(search_url, 0) + 1
+
+            # Promoted ads and overlapping searches repeat listings already returned
+            new_listings = self.drop_duplicates(listings)
+            total += len(new_listings)
+            print(f"Found {len(listings)} listings on page {page_count}, "
+                  f"{len(listings) - len(new_listings)} duplicates (total: {total})")
+            if new_listings:
+                yield new_listings
+
+            # With newest-first ordering, later pages only hold listings from earlier runs
+            if self.known_ids is not None:
+                share = self.known_share(listings)
+                if share >= self.stop_known_share:
+                    print(f"⏹️  {share:.0%} of page {page_count} already known, stopping...")
                     break
 
-                all_listings.extend(listings)
-                print(f"Found {len(listings)} listings on page {page_count} (total: {len(all_listings)})")
+            # Follow the next page URL (the rate limiter spaces out the requests)
+            if next_url and next_url != current_url:
+                current_url = next_url
+            else:
+                print("No more pages found")
+                break
 
-                # Get next page URL
-                next_url = self.get_next_page_url(html_content, current_url)
-                if next_url and next_url != current_url:
-                    current_url = next_url
-                    time.sleep(1)  # Be respectful, add delay between requests
-                else:
-                    print("No more pages found")
+    def scrape_many(self, search_urls, max_pages=10):
+        """Scrape several search URLs concurrently, returning {search_url: listings}
+
+        `max_pages` may also be a {search_url: max_pages} dict, e.g. from scheduler.QueryScheduler.plan.
+        """
+        self.reset_seen()
+
+        async def crawl_all():
+            return await asyncio.gather(
+                *(self.scrape_search_async(url, _page_limit(max_pages, url)) for url in search_urls)
+            )
+
+        results = self.fetch_engine.run(crawl_all())
+        return dict(zip(search_urls, results))
+
+    def iter_many(self, search_urls, max_pages=10, buffer_pages=4):
+        """Crawl several search URLs concurrently, yielding (search_url, listings) per page
+
+        The crawl runs on a background thread and at most `buffer_pages` pages wait
+        for the consumer, so memory stays flat however many pages are crawled.
+        `max_pages` may be a {search_url: max_pages} dict, as for scrape_many.
+        """
+        self.reset_seen()
+        pages = queue.Queue(maxsize=buffer_pages)
+        finished = object()
+        stopped = threading.Event()
+        errors = []
+
+        async def crawl(url):
+            loop = asyncio.get_running_loop()
+            async for listings in self.iter_search_async(url, _page_limit(max_pages, url)):
+                if stopped.is_set():
                     break
+                # Blocking put in a worker thread: a slow consumer pauses the crawl
+                await loop.run_in_executor(None, pages.put, (url, listings))
+
+        async def crawl_all():
+            await asyncio.gather(*(crawl(url) for url in search_urls))
 
+        def produce():
+            try:
+                self.fetch_engine.run(crawl_all())
             except Exception as e:
-                print(f"Error scraping page {page_count}: {e}")
-                break
+                errors.append(e)
+            finally:
+                pages.put(finished)
 
-        return all_listings
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if item is finished:
+                    break
+                yield item
+        finally:
+            stopped.set()
+            # Unblock a producer waiting on a full queue if the consumer stopped early
+            while producer.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+        if errors:
+            raise errors[0]
 
     def save_to_json(self, listings, filename='olx_listings.json'):
         """Save listings to JSON file"""
         with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(listings, f, ensure_ascii=False, indent=2)
+            json.dump([Listing.of(listing).to_dict() for listing in listings], f, ensure_ascii=False, indent=2)
         print(f"Saved {len(listings)} listings to {filename}")
 
     def save_to_csv(self, listings, filename='olx_listings.csv'):
@@ -240,40 +459,56 @@ class OLXScraper:
             fieldnames = ['title', 'price', 'location', 'date', 'link']
             writer = csv.DictWriter(f, fieldnames=fieldnames)
             writer.writeheader()
-            writer.writerows(listings)
+            writer.writerows(Listing.of(listing).to_dict() for listing in listings)
         print(f"Saved {len(listings)} listings to {filename}")
 
 
 def main():
-    # Example usage
-    scraper = OLXScraper()
-
-    # Multiple search URLs
-    search_urls = [
-        "https://www.olx.ro/oferte/q-xbox-defect/",
-        "https://www.olx.ro/oferte/q-playstation-defect/",
-        "https://www.olx.ro/oferte/q-nintendo-switch-defect/"
-    ]
+    from scheduler import QueryScheduler, load_queries
+
+    scraper = OLXScraper(cache=HTTPCache())
+    store = ListingStore()
+
+    # The searches due this run, within the request budget of queries.json
+    queries, budget, default_new_per_hour = load_queries()
+    scheduler = QueryScheduler(store, queries, budget, default_new_per_hour)
+    plan = scheduler.plan()
+    search_urls = [query.url for query, _ in plan]
+
+    print(f"\n{'='*50}")
+    print(f"Starting concurrent scrape of {len(search_urls)} of {len(queries)} searches")
+    print('\n'.join(scheduler.describe(plan)))
+    print(f"{'='*50}")
+
+    # All searches are crawled at once; results come back in search_urls order
+    started_at = time.time()
+    results = scraper.scrape_many(search_urls, max_pages={query.url: pages for query, pages in plan})
+    scraper.cache.flush()
+    print(f"🗄️  Page cache: {scraper.cache.summary()}")
+    print(f"🧹 Dropped {scraper.dedup_stats['duplicates']} duplicate listings "
+          f"({scraper.dedup_stats['unique']} unique)")
 
     all_listings = []
-    for search_url in search_urls:
-        print(f"\n{'='*50}")
-        print(f"Starting scrape of: {search_url}")
-        print(f"{'='*50}")
-
-        listings = scraper.scrape_search(search_url, max_pages=5)  # Limit to 5 pages for testing
+    known_ids = store.known_ids()
+    for url in search_urls:
+        listings = results[url]
+        # A failed or empty crawl says nothing about the search's rate: it stays due
+        if scraper.crawl_succeeded(url):
+            scheduler.record(url, sum(listing.listing_id not in known_ids for listing in listings), started_at)
         if listings:
             all_listings.extend(listings)
-            print(f"✓ Found {len(listings)} listings for {search_url.split('/')[-2]}")
+            print(f"✓ Found {len(listings)} listings for {url.split('/')[-2]}")
         else:
-            print(f"✗ No listings found for {search_url.split('/')[-2]}")
+            print(f"✗ No listings found for {url.split('/')[-2]}")
 
     if all_listings:
         print(f"\n🎯 Total scraped: {len(all_listings)} listings across all searches")
 
-        # Save to both JSON and CSV
-        scraper.save_to_json(all_listings)
-        scraper.save_to_csv(all_listings)
+        # Store the run, then export it to both JSON and CSV
+        # Listings of the searches the scheduler left out this run stay in the exports
+        run_id = store.start_run(scheduler.active_since())
+        store.upsert_listings(all_listings, run_id)
+        store.export_listings(run_id)
 
         # Show a sample of what was scraped
         print("\n📋 Sample of scraped data:")
@@ -290,6 +525,8 @@ def main():
             print(f"{i+1}. [{category}] {listing['title'][:50]}... - {listing['price']}")
     else:
         print("❌ No listings were scraped from any search. The page structure might have changed.")
+    store.close()
+    scraper.metrics.save()
 
 
 if __name__ == "__main__":
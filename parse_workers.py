@@ -0,0 +1,86 @@
+"""
+Parser worker processes: raw pages in, compact listing and verdict records out
+
+The scraper's and the filter's I/O threads only fetch. Building parse trees, the
+extraction and the page-level filter rules run in a ProcessPoolExecutor, so they use
+every core instead of sharing one GIL with the fetchers. Each worker process keeps
+its own OLXScraper and OLXDefectFilter (never used for requests) and returns Listing
+records (pickled as plain tuples) or reason strings, plus a snapshot of its parse
+metrics that is merged into the caller's RunMetrics.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from run_metrics import RunMetrics
+
+# Filter attributes copied into the workers, so they apply the caller's rules
+FILTER_RULES = ('forbidden_phrases', 'excluded_ps_models', 'excluded_switch_models', 'price_limits',
+                'exchange_rates')
+
+# Per-process parsers, set up by _init_worker
+_scraper = None
+_filter = None
+
+
+def _init_worker(parser_backend, structured_data, rules):
+    global _scraper, _filter
+    from olx_scraper import OLXScraper
+    from filter_defect_listings import OLXDefectFilter
+    _scraper = OLXScraper(parser_backend=parser_backend, structured_data=structured_data)
+    _filter = OLXDefectFilter(parser_backend=parser_backend)
+    for name, value in rules.items():
+        setattr(_filter, name, value)
+
+
+def _parse_search_page(html_content, url):
+    """(Listing records, next page URL, metrics snapshot)"""
+    _scraper.metrics = RunMetrics()
+    listings, next_url = _scraper.parse_search_page(html_content, url)
+    return listings, next_url, _scraper.metrics.snapshot()
+
+
+def _check_page(title, link, price, html_content, model):
+    """(check_page reason, metrics snapshot)"""
+    _filter.metrics = RunMetrics()
+    reason = _filter.check_page(title, link, price, html_content, model)
+    return reason, _filter.metrics.snapshot()
+
+
+class ParserPool:
+    """Process pool that parses search pages and checks listing pages for OLXScraper and OLXDefectFilter
+
+    Pass the same pool to both as `parser_pool`. `workers` defaults to the number of
+    CPUs; `defect_filter` supplies the filter rules if they differ from the defaults.
+    """
+
+    def __init__(self, workers=None, parser_backend='bs4', structured_data=True, defect_filter=None):
+        self.workers = workers or os.cpu_count() or 1
+        rules = {name: getattr(defect_filter, name) for name in FILTER_RULES} if defect_filter else {}
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(parser_backend, structured_data, rules)
+        )
+
+    async def parse_search_page_async(self, html_content, url, metrics):
+        """OLXScraper.parse_search_page in a worker: (listings, next_page_url)"""
+        future = self.executor.submit(_parse_search_page, html_content, url)
+        listings, next_url, snapshot = await asyncio.wrap_future(future)
+        metrics.merge(snapshot)
+        return listings, next_url
+
+    def check_page(self, title, link, price, html_content, metrics, model=None):
+        """OLXDefectFilter.check_page in a worker, blocking the calling thread until it is done"""
+        reason, snapshot = self.executor.submit(_check_page, title, link, price, html_content, model).result()
+        metrics.merge(snapshot)
+        return reason
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
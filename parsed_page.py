@@ -0,0 +1,45 @@
+"""
+HTML documents parsed once and shared by all extractors
+"""
+
+from bs4 import BeautifulSoup
+import lxml.html
+from lxml import etree
+
+
+class ParsedPage:
+    """An HTML response whose parse tree is built on first use and then reused"""
+
+    def __init__(self, html_content, url=None):
+        self.html = html_content
+        self.url = url
+        self._soup = None
+        self._tree = None
+
+    @classmethod
+    def of(cls, page_or_html, url=None):
+        """Return the ParsedPage unchanged, or wrap raw HTML in a new one"""
+        if isinstance(page_or_html, cls):
+            return page_or_html
+        return cls(page_or_html, url)
+
+    @property
+    def soup(self):
+        """BeautifulSoup tree of the page, built once"""
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html, 'lxml')
+        return self._soup
+
+    @property
+    def tree(self):
+        """Raw lxml.html tree of the page, built once (used by the lxml parser backend)"""
+        if self._tree is None:
+            try:
+                self._tree = lxml.html.document_fromstring(self.html)
+            except ValueError:
+                # lxml refuses str input that carries an XML encoding declaration
+                self._tree = lxml.html.document_fromstring(self.html.encode('utf-8'))
+            except etree.ParserError:
+                # Empty document: an empty tree, like BeautifulSoup returns
+                self._tree = lxml.html.document_fromstring('<html></html>')
+        return self._tree
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Streaming scrape -> filter pipeline: listing pages are verified while the crawl is still running
+"""
+
+import argparse
+import os
+import time
+from olx_scraper import OLXScraper
+from filter_defect_listings import OLXDefectFilter
+from http_cache import HTTPCache
+from run_metrics import RunMetrics
+from fetch_engine import AdaptiveRateLimiter
+from parse_workers import ParserPool
+from transport import Transport
+from storage import ListingStore, SQLiteVerdictStore
+from scheduler import QueryScheduler, load_queries, CONFIG_FILE
+
+# In incremental runs, listings seen this recently still count as current
+ACTIVE_HOURS = 48
+
+SEARCH_URLS = [
+    "https://www.olx.ro/oferte/q-xbox-defect/",
+    "https://www.olx.ro/oferte/q-playstation-defect/",
+    "https://www.olx.ro/oferte/q-nintendo-switch-defect/"
+]
+
+
+def run_pipeline(search_urls, max_pages=5, workers=8, scraper=None, defect_filter=None, store=None,
+                 listings_json='olx_listings.json', listings_csv='olx_listings.csv',
+                 output_file='olx_defect_only.csv', batch_size=50, incremental=False, scheduler=None):
+    """Crawl, store and filter listings in one pass; returns (scraped, kept, excluded) counts
+
+    Listings and verdicts go into the ListingStore in batches as they arrive; the
+    JSON/CSV files are exported from it once the run is complete.
+
+    With incremental=True, searches are crawled newest first and each one stops at
+    the first page made up mostly of listings stored by earlier runs. Listings seen
+    in the last ACTIVE_HOURS then stay in the exports even if this run did not reach them.
+    With a scheduler, so do those of the searches it left out (QueryScheduler.active_since).
+
+    `max_pages` may be a {search URL: pages} dict (QueryScheduler.plan). With a
+    scheduler, the number of new listings each search produced is recorded for it.
+    """
+    scraper = scraper or OLXScraper()
+    defect_filter = defect_filter or OLXDefectFilter()
+    store = store or ListingStore()
+    excluded_listings = defect_filter.load_excluded_listings()
+
+    active_since = None
+    # Crawled URL -> configured search URL
+    crawl_urls = {url: url for url in search_urls}
+    known_ids = store.known_ids() if incremental or scheduler else None
+    if incremental:
+        scraper.known_ids = known_ids
+        crawl_urls = {scraper.newest_first_url(url): url for url in search_urls}
+        active_since = time.time() - ACTIVE_HOURS * 3600
+    if scheduler:
+        # Searches the plan left out (even with incremental=False) keep their listings in the exports
+        active_since = min(active_since or time.time(), scheduler.active_since())
+    if isinstance(max_pages, dict):
+        max_pages = {url: max_pages[search_url] for url, search_url in crawl_urls.items()}
+    started_at = time.time()
+    run_id = store.start_run(active_since)
+    scraped_count = kept = excluded = 0
+    new_listings = dict.fromkeys(search_urls, 0)
+
+    def scraped():
+        nonlocal scraped_count
+        for url, listings in scraper.iter_many(list(crawl_urls), max_pages):
+            if scheduler:
+                new_listings[crawl_urls[url]] += sum(listing.listing_id not in known_ids for listing in listings)
+            store.upsert_listings(listings, run_id)
+            scraped_count += len(listings)
+            yield listings
+
+    verdicts = []
+    for listing, is_excluded in defect_filter.iter_filter_batches(scraped(), excluded_listings, workers):
+        if is_excluded is None:
+            continue
+        if is_excluded:
+            excluded += 1
+        else:
+            kept += 1
+        verdicts.append((listing.listing_id, not is_excluded))
+        if len(verdicts) >= batch_size:
+            store.mark_kept(verdicts)
+            verdicts = []
+    store.mark_kept(verdicts)
+
+    for cache in {id(c): c for c in (scraper.cache, defect_filter.cache) if c}.values():
+        cache.flush()
+    if defect_filter.verdicts is not None:
+        defect_filter.verdicts.save()
+    if scheduler:
+        # A failed or empty crawl says nothing about the search's rate: it stays due
+        for crawl_url, url in crawl_urls.items():
+            if scraper.crawl_succeeded(crawl_url):
+                scheduler.record(url, new_listings[url], started_at)
+
+    store.export_listings(run_id, listings_json, listings_csv)
+    store.export_defect_listings(run_id, output_file)
+    return scraped_count, kept, excluded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape and filter OLX defect listings in one pass")
+    parser.add_argument('max_pages', nargs='?', type=int, default=5,
+                        help="max pages per search without a queries file (default: 5)")
+    parser.add_argument('--queries', default=CONFIG_FILE,
+                        help=f"searches, priorities and request budget (default: {CONFIG_FILE}; "
+                             "without it, the built-in searches are all crawled)")
+    parser.add_argument('--budget', type=int, help="search page requests this run (default: from the queries file)")
+    parser.add_argument('--full', action='store_true', help="crawl every page instead of stopping at known listings")
+    parser.add_argument('--parser', choices=['bs4', 'lxml'], default='bs4', help="HTML extraction backend")
+    parser.add_argument('--parser-workers', type=int, default=0,
+                        help="parse pages in this many worker processes (default: 0, in the fetching threads)")
+    parser.add_argument('--rate', type=float, default=3.0,
+                        help="max requests per second to olx.ro, search and listing pages together (default: 3)")
+    parser.add_argument('--trust-listing-prices', action='store_true',
+                        help="apply the price limits to the scraped price, without fetching those listing pages")
+    parser.add_argument('--metrics-file', default='run_metrics.json', help="JSON metrics of this run")
+    parser.add_argument('--prometheus-file', help="also write the metrics as a Prometheus textfile")
+    args = parser.parse_args()
+    max_pages = args.max_pages
+
+    # Worker processes are started before any fetching thread
+    parser_pool = ParserPool(args.parser_workers, args.parser) if args.parser_workers > 0 else None
+    cache = HTTPCache()
+    store = ListingStore()
+    metrics = RunMetrics()
+    # One limiter for both stages: a 429 on a listing page also slows down the crawl
+    rate_limiter = AdaptiveRateLimiter(max_rate=args.rate)
+    # One connection pool for both stages, sized to the crawl's and the filter's requests in flight
+    scraper_concurrency, filter_workers = 4, 8
+    transport = Transport(pool_size=scraper_concurrency + filter_workers)
+    scraper = OLXScraper(max_concurrency=scraper_concurrency, cache=cache, parser_backend=args.parser, metrics=metrics,
+                         rate_limiter=rate_limiter, parser_pool=parser_pool, transport=transport)
+    defect_filter = OLXDefectFilter(cache=cache, verdicts=SQLiteVerdictStore(store), parser_backend=args.parser,
+                                    metrics=metrics, rate_limiter=rate_limiter, parser_pool=parser_pool,
+                                    transport=transport)
+    defect_filter.trust_listing_prices = args.trust_listing_prices
+
+    scheduler = None
+    search_urls = SEARCH_URLS
+    if os.path.exists(args.queries):
+        queries, budget, default_new_per_hour = load_queries(args.queries)
+        scheduler = QueryScheduler(store, queries, args.budget or budget, default_new_per_hour)
+        plan = scheduler.plan()
+        search_urls = [query.url for query, _ in plan]
+        max_pages = {query.url: pages for query, pages in plan}
+        print(f"🗓️  {len(plan)} of {len(queries)} searches due, {sum(max_pages.values())} of {scheduler.budget} pages:")
+        print('\n'.join(scheduler.describe(plan)))
+    else:
+        print(f"🚀 Streaming {len(SEARCH_URLS)} searches through the filter (max {max_pages} pages each)")
+    try:
+        scraped, kept, excluded = run_pipeline(search_urls, max_pages, workers=filter_workers, scraper=scraper,
+                                               defect_filter=defect_filter, store=store,
+                                               incremental=not args.full, scheduler=scheduler)
+    finally:
+        if parser_pool:
+            parser_pool.close()
+        store.close()
+        metrics.save(args.metrics_file, args.prometheus_file)
+
+    print("\n📊 Pipeline Summary:")
+    print(f"   Scraped: {scraped} unique ({scraper.dedup_stats['duplicates']} duplicates dropped)")
+    print(f"   Excluded (no defects): {excluded}")
+    print(f"   Kept (with defects): {kept}")
+    print(f"🗄️  Page cache: {cache.summary()}")
+    print(f"🌐 Transport: {transport.summary()}")
+    print(f"🚦 Rate limiter: {rate_limiter.throttled} throttled responses, ended at {rate_limiter.rate:.2f} requests/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Append-only price history of every listing seen, stored as typed columns
+
+price_data/ holds three files:
+  ids.txt           listing IDs, one per line; the line number is the listing's index
+  observations.bin  one record per new listing or price change (listing index, time,
+                    price in bani/cents, currency), only ever appended to
+  listings.bin      one record per listing index: first/last seen, latest price and
+                    the price before the latest change, rewritten at the end of each run
+
+Change detection compares a whole run's snapshot against listings.bin with array
+operations, so a run costs the same whatever the length of the history.
+"""
+
+import json
+import os
+import numpy as np
+from embedded_data import format_amount
+from listing import parse_price
+from storage import isoformat
+
+CURRENCIES = ('RON', 'EUR')
+NO_PRICE = -1
+
+OBSERVATION = np.dtype([('listing', '<u4'), ('observed_at', '<f8'), ('price', '<i8'), ('currency', 'u1')])
+LISTING = np.dtype([('first_seen', '<f8'), ('last_seen', '<f8'), ('price', '<i8'), ('currency', 'u1'),
+                    ('previous_price', '<i8'), ('previous_currency', 'u1')])
+# listings.bin starts with this marker; files without it hold the records below
+LISTINGS_FORMAT = b'OLXPH\x00\x00\x02'
+LEGACY_LISTING = np.dtype([('first_seen', '<f8'), ('last_seen', '<f8'), ('price', '<i8'), ('currency', 'u1')])
+
+
+def price_minor_units(price):
+    """Return (price in bani/cents or NO_PRICE, currency index) for a price string such as "1.250 lei" """
+    amount, currency = parse_price(price)
+    if amount is None:
+        return NO_PRICE, 0
+    return amount, CURRENCIES.index(currency)
+
+
+def format_minor_units(price, currency):
+    """Inverse of price_minor_units: "1.250 lei", "99,50 €" or "N/A" """
+    if price == NO_PRICE:
+        return "N/A"
+    return format_amount(price / 100, CURRENCIES[currency])
+
+
+class PriceHistory:
+    """Listing ID index, per-listing state columns and the append-only observation log"""
+
+    def __init__(self, directory='price_data'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.ids = []
+        self.index = {}
+        if os.path.exists(self._path('ids.txt')):
+            with open(self._path('ids.txt'), 'r', encoding='utf-8') as f:
+                self.ids = f.read().splitlines()
+            self.index = {listing_id: i for i, listing_id in enumerate(self.ids)}
+        self._saved_ids = len(self.ids)
+
+        self.listings = self._new_listings(len(self.ids))
+        if os.path.exists(self._path('listings.bin')):
+            self._load_listings()
+        self._pending = []
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @staticmethod
+    def _new_listings(count):
+        listings = np.zeros(count, LISTING)
+        listings['previous_price'] = NO_PRICE
+        return listings
+
+    def _load_listings(self):
+        with open(self._path('listings.bin'), 'rb') as f:
+            legacy = f.read(len(LISTINGS_FORMAT)) != LISTINGS_FORMAT
+        if not legacy:
+            saved = np.fromfile(self._path('listings.bin'), LISTING, offset=len(LISTINGS_FORMAT))[:len(self.ids)]
+            self.listings[:len(saved)] = saved
+            return
+        # Written before listings.bin kept previous prices: take them from the observation log, once
+        saved = np.fromfile(self._path('listings.bin'), LEGACY_LISTING)[:len(self.ids)]
+        for field in LEGACY_LISTING.names:
+            self.listings[field][:len(saved)] = saved[field]
+        self.listings['previous_price'], self.listings['previous_currency'] = self._previous_from_observations()
+
+    def _indices(self, listing_ids):
+        """Indices of the given listing IDs, adding the ones not seen before"""
+        indices = np.empty(len(listing_ids), np.uint32)
+        for i, listing_id in enumerate(listing_ids):
+            position = self.index.get(listing_id)
+            if position is None:
+                position = self.index[listing_id] = len(self.ids)
+                self.ids.append(listing_id)
+            indices[i] = position
+        if len(self.ids) > len(self.listings):
+            grown = self._new_listings(len(self.ids))
+            grown[:len(self.listings)] = self.listings
+            self.listings = grown
+        return indices
+
+    def record_snapshot(self, listing_ids, prices, observed_at):
+        """Record the prices of one run's listings (IDs and price strings, IDs unique)
+
+        Returns a dict with the IDs of new listings and of listings whose price
+        dropped or rose, and for the changed ones their old and new price.
+        """
+        indices = self._indices(listing_ids)
+        parsed = [price_minor_units(price) for price in prices]
+        price = np.fromiter((p for p, _ in parsed), np.int64, len(parsed))
+        currency = np.fromiter((c for _, c in parsed), np.uint8, len(parsed))
+
+        previous = self.listings[indices]
+        is_new = previous['first_seen'] == 0
+        changed = ~is_new & ((previous['price'] != price) | (previous['currency'] != currency))
+        # Only prices in the same currency, both known, are drops or rises
+        comparable = changed & (previous['price'] != NO_PRICE) & (price != NO_PRICE) & (
+            previous['currency'] == currency)
+        dropped = comparable & (price < previous['price'])
+        rose = comparable & (price > previous['price'])
+
+        logged = is_new | changed
+        observations = np.zeros(int(logged.sum()), OBSERVATION)
+        observations['listing'] = indices[logged]
+        observations['observed_at'] = observed_at
+        observations['price'] = price[logged]
+        observations['currency'] = currency[logged]
+        self._pending.append(observations)
+
+        self.listings['first_seen'][indices[is_new]] = observed_at
+        self.listings['previous_price'][indices[changed]] = previous['price'][changed]
+        self.listings['previous_currency'][indices[changed]] = previous['currency'][changed]
+        self.listings['last_seen'][indices] = observed_at
+        self.listings['price'][indices] = price
+        self.listings['currency'][indices] = currency
+
+        def described(mask, change):
+            return [{
+                'listing_id': listing_ids[i],
+                'change': change,
+                'old_price': format_minor_units(previous['price'][i], previous['currency'][i]),
+                'new_price': prices[i]
+            } for i in np.flatnonzero(mask)]
+
+        return {
+            'new': [listing_ids[i] for i in np.flatnonzero(is_new)],
+            'drops': described(dropped, 'down'),
+            'rises': described(rose, 'up')
+        }
+
+    def seen(self, listing_id):
+        """Return (first_seen, last_seen) timestamps of a listing, or None if it was never seen"""
+        position = self.index.get(listing_id)
+        if position is None or not self.listings['first_seen'][position]:
+            return None
+        entry = self.listings[position]
+        return float(entry['first_seen']), float(entry['last_seen'])
+
+    def observations(self):
+        """Every saved observation, memory-mapped rather than read into memory"""
+        path = self._path('observations.bin')
+        if not os.path.exists(path) or not os.path.getsize(path):
+            return np.zeros(0, OBSERVATION)
+        return np.memmap(path, OBSERVATION, mode='r')
+
+    def save(self):
+        """Append the new IDs and observations, then replace the listing state file"""
+        with open(self._path('ids.txt'), 'a', encoding='utf-8') as f:
+            for listing_id in self.ids[self._saved_ids:]:
+                f.write(listing_id + '\n')
+        self._saved_ids = len(self.ids)
+        with open(self._path('observations.bin'), 'ab') as f:
+            for observations in self._pending:
+                observations.tofile(f)
+        self._pending = []
+        tmp_filename = self._path('listings.bin.tmp')
+        with open(tmp_filename, 'wb') as f:
+            f.write(LISTINGS_FORMAT)
+            self.listings.tofile(f)
+        os.replace(tmp_filename, self._path('listings.bin'))
+
+    def previous_prices(self):
+        """Price and currency of each listing (by index) before its latest change; NO_PRICE if it never changed"""
+        return self.listings['previous_price'], self.listings['previous_currency']
+
+    def _previous_from_observations(self):
+        """previous_prices() rebuilt by sorting the whole observation log (migrates old listings.bin files)"""
+        observations = self.observations()
+        ordered = observations[np.lexsort((observations['observed_at'], observations['listing']))]
+        listing = ordered['listing']
+        # Position of each listing's latest observation, and of the one before it
+        latest = np.flatnonzero(np.append(listing[1:] != listing[:-1], True)) if len(listing) else np.zeros(0, int)
+        before = latest - 1
+        changed = (before >= 0) & (listing[np.maximum(before, 0)] == listing[latest])
+
+        price = np.full(len(self.ids), NO_PRICE, np.int64)
+        currency = np.zeros(len(self.ids), np.uint8)
+        price[listing[latest[changed]]] = ordered['price'][before[changed]]
+        currency[listing[latest[changed]]] = ordered['currency'][before[changed]]
+        return price, currency
+
+    def histories(self, listing_ids):
+        """Price history of the given listings in the website's format, by listing ID"""
+        wanted = {self.index[listing_id] for listing_id in listing_ids if listing_id in self.index}
+        observations = self.observations()
+        selected = observations[np.isin(observations['listing'], np.fromiter(wanted, np.uint32, len(wanted)))]
+        selected = selected[np.lexsort((selected['observed_at'], selected['listing']))]
+
+        history = {}
+        for rows in np.split(selected, np.flatnonzero(np.diff(selected['listing'])) + 1):
+            if not len(rows):
+                continue
+            position = rows[0]['listing']
+            changes = []
+            for old, new in zip(rows, rows[1:]):
+                if NO_PRICE in (old['price'], new['price']) or old['currency'] != new['currency']:
+                    continue
+                changes.append({
+                    'change': 'up' if new['price'] > old['price'] else 'down',
+                    'old_price': format_minor_units(old['price'], old['currency']),
+                    'new_price': format_minor_units(new['price'], new['currency'])
+                })
+            entry = self.listings[position]
+            history[self.ids[position]] = {
+                'price': format_minor_units(entry['price'], entry['currency']),
+                'first_seen': isoformat(entry['first_seen']),
+                'last_updated': isoformat(entry['last_seen']),
+                'changes': changes
+            }
+        return history
+
+    def export_json(self, listing_ids, filename='price_history.json'):
+        """Write the price history of the given listings in the website's JSON format"""
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.histories(listing_ids), f, ensure_ascii=False, indent=2)
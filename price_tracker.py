@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Update followed listings and their price history after a scrape run
+"""
+
+import json
+import os
+from price_history import PriceHistory
+from listing import get_listing_id
+from storage import ListingStore
+
+
+def load_json(filename):
+    """Load a JSON object from a file, or {} if it does not exist yet"""
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+
+def save_json(data, filename):
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def update_tracking(store, history, followed_file='followed_listings.json', excluded_file='excluded_listings.json',
+                    price_history_file='price_history.json'):
+    """Drop expired followed listings, record the latest run's prices and export the followed price history"""
+    followed_listings = load_json(followed_file)
+    excluded_listings = load_json(excluded_file)
+
+    # Listings kept by the filter in the latest run
+    current_listings = {}
+    run_id = store.latest_run()
+    if run_id is not None:
+        for listing in store.iter_run_listings(run_id, kept_only=True):
+            current_listings[get_listing_id(listing['link'])] = listing
+
+    # Remove expired followed listings (those no longer in current results)
+    for listing_id in [listing_id for listing_id in followed_listings if listing_id not in current_listings]:
+        del followed_listings[listing_id]
+        print(f'Removed expired followed listing: {listing_id}')
+
+    # Note: Excluded listings are permanent and not auto-removed
+
+    # Track the prices of every listing seen in the run; report the changes of followed ones
+    summary = {'new': [], 'drops': [], 'rises': []}
+    if run_id is not None:
+        summary = history.record_snapshot(*store.run_prices(run_id))
+        history.save()
+    price_changes = [
+        change for change in summary['drops'] + summary['rises'] if change['listing_id'] in followed_listings
+    ]
+    for change in price_changes:
+        arrow = '📈 Price increased' if change['change'] == 'up' else '📉 Price decreased'
+        print(f"{arrow} for {change['listing_id']}: {change['old_price']} → {change['new_price']}")
+
+    history.export_json(followed_listings, price_history_file)
+    save_json(followed_listings, followed_file)
+    save_json(excluded_listings, excluded_file)
+
+    print(f'Updated followed listings: {len(followed_listings)} remaining')
+    print(f'Excluded listings: {len(excluded_listings)} permanent exclusions')
+    print(f"Price history: {len(summary['new'])} new listings, {len(summary['drops'])} price drops, "
+          f"{len(summary['rises'])} price rises")
+    print(f'Price changes detected: {len(price_changes)}')
+    return price_changes
+
+
+def main():
+    store = ListingStore()
+    try:
+        update_tracking(store, PriceHistory())
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Crawl through a shared work queue (work_queue.py) with any number of worker processes
+
+    python queue_worker.py seed "xbox defect" "ps4 defect" --max-pages 5
+    python queue_worker.py work --processes 4      # on this or any machine sharing the files
+    python queue_worker.py status
+    python queue_worker.py export                  # once the queue is drained
+
+A 'search' task fetches one results page: its listings go into the ListingStore, the
+ones the filter's rules cannot decide become 'detail' tasks, and the next page becomes
+a new 'search' task. A 'detail' task checks one listing page and records the verdict.
+Workers exit when no task is pending or leased; a crashed worker's tasks are leased
+again once their lease expires.
+"""
+
+import argparse
+import multiprocessing
+import sys
+import time
+from olx_scraper import OLXScraper, search_url
+from filter_defect_listings import OLXDefectFilter
+from http_cache import HTTPCache
+from storage import ListingStore, SQLiteVerdictStore
+from work_queue import WorkQueue
+from pipeline import SEARCH_URLS
+
+SEARCH, DETAIL = 'search', 'detail'
+
+
+class QueueWorker:
+    """One worker process: leases search and detail tasks until the queue is drained"""
+
+    def __init__(self, queue, store, rate=1.0, detail_batch=8, poll_seconds=1.0):
+        self.queue = queue
+        self.store = store
+        self.run_id = queue.get_meta('run_id')
+        if self.run_id is None:
+            raise SystemExit(f"❌ {queue.path} has no run: seed it first (python queue_worker.py seed ...)")
+        self.max_pages = queue.get_meta('max_pages', 5)
+        self.detail_batch = detail_batch
+        self.poll_seconds = poll_seconds
+        cache = HTTPCache()
+        self.scraper = OLXScraper(requests_per_second=rate, cache=cache)
+        self.defect_filter = OLXDefectFilter(cache=cache, verdicts=SQLiteVerdictStore(store),
+                                             rate_limiter=self.scraper.rate_limiter, transport=self.scraper.transport)
+        self.excluded_listings = self.defect_filter.load_excluded_listings()
+        self.done = {SEARCH: 0, DETAIL: 0}
+
+    def run_search(self, task):
+        url, page = task.payload['url'], task.payload['page']
+        listings, next_url = self.scraper.parse_search_page(self.scraper.get_page(url), url)
+        if listings:
+            self.store.upsert_listings(listings, self.run_id)
+            reasons = self.defect_filter.prescreen(listings, self.excluded_listings)
+            self.store.mark_kept([
+                (listing.listing_id, False) for listing, reason in zip(listings, reasons) if reason
+            ])
+            # Keyed by listing ID: a listing found by several searches is checked once
+            self.queue.put_many(DETAIL, [
+                (listing.listing_id, listing.to_dict()) for listing, reason in zip(listings, reasons) if reason is None
+            ])
+            if next_url and next_url != url and page < self.max_pages:
+                self.queue.put(SEARCH, next_url, {'url': next_url, 'page': page + 1})
+        return len(listings)
+
+    def run_detail(self, task):
+        excluded = self.defect_filter.check_row(task.payload, self.excluded_listings, screened=True)
+        # mark_kept also commits the verdict written by check_row
+        self.store.mark_kept([] if excluded is None else [(task.key, not excluded)])
+        return excluded
+
+    def run(self):
+        """Work until no task is pending or leased anywhere; returns the tasks done per queue"""
+        while True:
+            # Search pages first, so every worker soon has listing pages to check
+            tasks = self.queue.lease(SEARCH) or self.queue.lease(DETAIL, self.detail_batch)
+            if not tasks:
+                if not self.queue.unfinished():
+                    return self.done
+                # Other workers hold the remaining leases; theirs may still expire
+                time.sleep(self.poll_seconds)
+                continue
+            for task in tasks:
+                try:
+                    result = self.run_search(task) if task.queue == SEARCH else self.run_detail(task)
+                except Exception as e:
+                    print(f"⚠️  {task} failed: {e}")
+                    self.queue.fail(task, e)
+                    continue
+                if self.queue.complete(task, result):
+                    self.done[task.queue] += 1
+
+
+def work(args):
+    queue = WorkQueue(args.queue, args.lease_seconds, args.max_attempts, wal=not args.shared_fs)
+    store = ListingStore(args.db)
+    worker = None
+    try:
+        worker = QueueWorker(queue, store, args.rate, args.detail_batch)
+        done = worker.run()
+        print(f"✅ Worker {queue.owner} done: {done[SEARCH]} search pages, {done[DETAIL]} listing pages")
+    finally:
+        if worker is not None:
+            # Worker processes skip atexit hooks: write the cache index and commit verdicts here
+            worker.scraper.cache.flush()
+            worker.defect_filter.verdicts.save()
+        store.close()
+        queue.close()
+
+
+def seed(args, queue):
+    terms = args.terms
+    urls = [search_url(term) for term in terms] if terms else SEARCH_URLS
+    store = ListingStore(args.db)
+    try:
+        run_id = store.start_run()
+    finally:
+        store.close()
+    queue.reset()
+    queue.set_meta('run_id', run_id)
+    queue.set_meta('max_pages', args.max_pages)
+    queue.put_many(SEARCH, [(url, {'url': url, 'page': 1}) for url in urls])
+    print(f"🌱 Seeded run {run_id} with {len(urls)} searches (max {args.max_pages} pages each)")
+
+
+def status(queue):
+    for name, states in sorted(queue.counts().items()):
+        print(f"{name}: " + ', '.join(f"{count} {state}" for state, count in sorted(states.items())))
+    print(f"Unfinished: {queue.unfinished()}")
+
+
+def export(args, queue):
+    if queue.unfinished():
+        print(f"⚠️  {queue.unfinished()} tasks are still pending or leased")
+    store = ListingStore(args.db)
+    try:
+        run_id = queue.get_meta('run_id')
+        store.export_listings(run_id)
+        store.export_defect_listings(run_id)
+    finally:
+        store.close()
+    print(f"💾 Exported run {run_id}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl and filter OLX searches through a shared work queue")
+    parser.add_argument('command', choices=['seed', 'work', 'status', 'export'])
+    parser.add_argument('terms', nargs='*', help="search terms or URLs to seed (default: the pipeline's searches)")
+    parser.add_argument('--max-pages', type=int, default=5, help="max pages per search (default: 5)")
+    parser.add_argument('--processes', type=int, default=1, help="worker processes to start (default: 1)")
+    parser.add_argument('--rate', type=float, default=1.0, help="max requests per second per worker (default: 1)")
+    parser.add_argument('--detail-batch', type=int, default=8, help="listing pages leased at once (default: 8)")
+    parser.add_argument('--lease-seconds', type=float, default=300, help="lease length (default: 300)")
+    parser.add_argument('--max-attempts', type=int, default=3, help="leases per task before it fails (default: 3)")
+    parser.add_argument('--queue', default='work_queue.db', help="work queue file (default: work_queue.db)")
+    parser.add_argument('--db', default='olx_data.db', help="listing database (default: olx_data.db)")
+    parser.add_argument('--shared-fs', action='store_true',
+                        help="the files are shared with other machines (no WAL journal)")
+    args = parser.parse_args()
+
+    if args.command == 'work':
+        processes = [multiprocessing.Process(target=work, args=(args,)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        sys.exit(max(process.exitcode for process in processes))
+
+    queue = WorkQueue(args.queue, args.lease_seconds, args.max_attempts, wal=not args.shared_fs)
+    try:
+        if args.command == 'seed':
+            seed(args, queue)
+        elif args.command == 'status':
+            status(queue)
+        else:
+            export(args, queue)
+    finally:
+        queue.close()
+
+
+if __name__ == "__main__":
+    main()
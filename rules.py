@@ -0,0 +1,87 @@
+"""
+Filter rules compiled once and evaluated over batches of listings
+
+A RuleSet holds the phrase lists, the per-model price limits and the exchange rates
+used to compare prices in other currencies. evaluate() decides what it can for a
+whole batch without fetching anything: manual exclusions, forbidden phrases in the
+title or URL, unwanted models and, if the scraped prices can be trusted, price
+limits (compared across the batch on numpy columns of model and price). Listings it
+cannot decide are left for the listing page check.
+"""
+
+import numpy as np
+from listing import MODEL_PRIORITY, parse_price
+from text_matcher import RuleMatcher
+
+# Lei per unit of currency, to compare prices with the limits (which are in lei)
+EXCHANGE_RATES = {'RON': 1.0, 'EUR': 5.0}
+
+# Exclusion reasons, in the order the rules are applied
+REASONS = ('manual', 'title', 'url', 'ps_model', 'switch_model', 'price')
+
+
+class RuleSet:
+    """Phrase, model and price rules of OLXDefectFilter in compiled form"""
+
+    def __init__(self, forbidden_phrases, excluded_ps_models, excluded_switch_models, price_limits,
+                 exchange_rates=None):
+        self.matcher = RuleMatcher({
+            'forbidden': forbidden_phrases,
+            'ps_models': excluded_ps_models,
+            'switch_models': excluded_switch_models,
+            'models': MODEL_PRIORITY
+        })
+        self.exchange_rates = exchange_rates or EXCHANGE_RATES
+
+        # Model code -> limit in bani (code -1, no model, and models without a limit: none)
+        self.model_codes = {model: code for code, model in enumerate(MODEL_PRIORITY)}
+        self.limits = np.array(
+            [price_limits.get(model) * 100 if price_limits.get(model) else np.inf for model in MODEL_PRIORITY]
+            + [np.inf]
+        )
+
+    def price_in_lei(self, amount, currency):
+        """Price in bani of an amount in minor units of `currency`, or NaN if it cannot be compared"""
+        if amount is None or currency not in self.exchange_rates:
+            return np.nan
+        return amount * self.exchange_rates[currency]
+
+    def price_too_high(self, model, price_string):
+        """Whether a price string exceeds the limit for the model"""
+        amount, currency = parse_price(price_string)
+        return bool(self.price_in_lei(amount, currency) > self.limits[self.model_codes.get(model, -1)])
+
+    def evaluate(self, listings, excluded_listings=None, trust_prices=False):
+        """Return an exclusion reason per Listing, or None where the listing page has to be checked
+
+        The price rule only applies with trust_prices=True: otherwise the price on the
+        listing page, which may differ from the scraped one, decides.
+        """
+        count = len(listings)
+        reasons = [None] * count
+        models = np.full(count, -1, np.int16)
+        prices = np.full(count, np.nan)
+
+        for i, listing in enumerate(listings):
+            if excluded_listings and listing.listing_id in excluded_listings:
+                reasons[i] = 'manual'
+                continue
+            # One pass over the title finds the phrases of every group
+            title_matches = self.matcher.match(listing.title or '')
+            if title_matches['forbidden']:
+                reasons[i] = 'title'
+            elif self.matcher.match((listing.link or '').lower())['forbidden']:
+                reasons[i] = 'url'
+            elif title_matches['ps_models']:
+                reasons[i] = 'ps_model'
+            elif title_matches['switch_models']:
+                reasons[i] = 'switch_model'
+            else:
+                models[i] = self.model_codes.get(listing.model, -1)
+                prices[i] = self.price_in_lei(listing.price_minor, listing.currency)
+
+        if trust_prices:
+            # NaN (no price, or an unknown currency) is never over a limit
+            for i in np.flatnonzero(prices > self.limits[models]):
+                reasons[i] = 'price'
+        return reasons
@@ -0,0 +1,162 @@
+"""
+Counters and histograms for one scrape/filter run
+
+Written at the end of a run as JSON (run_metrics.json) and, optionally, as a
+Prometheus textfile for node_exporter's textfile collector.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds (seconds) by metric name
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PARSE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+BUCKETS = {
+    'fetch_seconds': LATENCY_BUCKETS,
+    'check_seconds': LATENCY_BUCKETS,
+    'parse_seconds': PARSE_BUCKETS
+}
+
+
+class _Histogram:
+    """Cumulative bucket counts, sum and count of the observed values"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RunMetrics:
+    """Thread-safe labelled counters and histograms, shared by the scraper and the filter"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, amount=1, **labels):
+        """Add `amount` to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        """Record a value (a duration in seconds) in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def snapshot(self):
+        """Plain, picklable copy of the counters and histograms, for merge() in another process"""
+        with self.lock:
+            return (
+                dict(self.counters),
+                {key: (h.bounds, list(h.counts), h.sum, h.count) for key, h in self.histograms.items()}
+            )
+
+    def merge(self, snapshot):
+        """Add the metrics of a snapshot (e.g. from a parser worker process) to these"""
+        counters, histograms = snapshot
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            for key, (bounds, counts, total, count) in histograms.items():
+                histogram = self.histograms.get(key)
+                if histogram is None:
+                    histogram = self.histograms[key] = _Histogram(bounds)
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += total
+                histogram.count += count
+
+    def to_dict(self):
+        """Snapshot of every metric, as written to the JSON metrics file"""
+        with self.lock:
+            counters = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                counters.setdefault(name, []).append({'labels': dict(labels), 'value': value})
+            histograms = {}
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                histograms.setdefault(name, []).append({
+                    'labels': dict(labels),
+                    'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'buckets': {str(bound): count for bound, count in zip(histogram.bounds, histogram.counts)}
+                })
+        return {
+            'started_at': self.started_at,
+            'duration_seconds': round(time.time() - self.started_at, 3),
+            'counters': counters,
+            'histograms': histograms
+        }
+
+    def prometheus_text(self, prefix='olx_'):
+        """The metrics in the Prometheus text exposition format"""
+        data = self.to_dict()
+        lines = [
+            f"# TYPE {prefix}run_duration_seconds gauge",
+            f"{prefix}run_duration_seconds {data['duration_seconds']}",
+            f"# TYPE {prefix}run_started_timestamp_seconds gauge",
+            f"{prefix}run_started_timestamp_seconds {data['started_at']:.0f}"
+        ]
+        for name, series in data['counters'].items():
+            lines.append(f"# TYPE {prefix}{name}_total counter")
+            for entry in series:
+                lines.append(f"{prefix}{name}_total{_labels(entry['labels'])} {entry['value']}")
+        for name, series in data['histograms'].items():
+            lines.append(f"# TYPE {prefix}{name} histogram")
+            for entry in series:
+                for bound, count in entry['buckets'].items():
+                    lines.append(f"{prefix}{name}_bucket{_labels(entry['labels'], le=bound)} {count}")
+                lines.append(f"{prefix}{name}_bucket{_labels(entry['labels'], le='+Inf')} {entry['count']}")
+                lines.append(f"{prefix}{name}_sum{_labels(entry['labels'])} {entry['sum']}")
+                lines.append(f"{prefix}{name}_count{_labels(entry['labels'])} {entry['count']}")
+        return '\n'.join(lines) + '\n'
+
+    def save(self, json_file='run_metrics.json', prometheus_file=None):
+        """Write the JSON metrics file and, if given, the Prometheus textfile (atomically)"""
+        _write_atomic(json_file, json.dumps(self.to_dict(), indent=2))
+        print(f"📈 Saved run metrics to {json_file}")
+        if prometheus_file:
+            _write_atomic(prometheus_file, self.prometheus_text())
+            print(f"📈 Saved Prometheus metrics to {prometheus_file}")
+
+
+def _labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _write_atomic(filename, text):
+    """Replace a file in one step, so collectors never read a partial file"""
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_filename, filename)
@@ -3,54 +3,96 @@
 Simple script to run the OLX scraper with custom search terms
 """
 
-import sys
-import os
-from olx_scraper import OLXScraper
+import argparse
+import time
+from olx_scraper import OLXScraper, search_url
+
+
+def save_results(scraper, term, listings):
+    # Generate filenames based on search term
+    safe_filename = term.replace(' ', '_').replace('-', '_').lower()
+    json_file = f"olx_{safe_filename}.json"
+    csv_file = f"olx_{safe_filename}.csv"
+
+    # Save with custom filenames
+    scraper.save_to_json(listings, json_file)
+    scraper.save_to_csv(listings, csv_file)
+    print(f"📄 Saved to: {json_file} and {csv_file}")
+
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python run_scraper.py <search_term> [max_pages]")
-        print("Example: python run_scraper.py 'xbox defect' 10")
-        print("Or: python run_scraper.py 'iphone 12' 5")
-        return
+    parser = argparse.ArgumentParser(
+        description="Scrape OLX searches into olx_<term>.json/.csv",
+        epilog="Examples: python run_scraper.py 'xbox defect' 10 | "
+               "python run_scraper.py 'iphone 12' 'iphone 13' --max-pages 3 | python run_scraper.py --scheduled"
+    )
+    parser.add_argument('terms', nargs='*', help="search terms (a trailing number is the max pages, as before)")
+    parser.add_argument('--max-pages', type=int, default=5, help="max pages per search (default: 5)")
+    parser.add_argument('--scheduled', action='store_true',
+                        help="scrape the searches of queries.json that are due, within its request budget")
+    args = parser.parse_args()
 
-    search_term = sys.argv[1]
-    max_pages = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    terms = args.terms
+    max_pages = args.max_pages
+    if len(terms) > 1 and terms[-1].isdigit():
+        terms, max_pages = terms[:-1], int(terms[-1])
 
-    # Create the OLX search URL
-    # Replace spaces with dashes and encode the search term
-    search_term_encoded = search_term.replace(' ', '-').lower()
-    search_url = f"https://www.olx.ro/oferte/q-{search_term_encoded}/"
+    scheduler = None
+    if args.scheduled:
+        from scheduler import QueryScheduler, load_queries
+        from storage import ListingStore
+        store = ListingStore()
+        queries, budget, default_new_per_hour = load_queries()
+        scheduler = QueryScheduler(store, queries, budget, default_new_per_hour)
+        plan = scheduler.plan()
+        terms = [query.term for query, _ in plan]
+        search_urls = [query.url for query, _ in plan]
+        max_pages = {query.url: pages for query, pages in plan}
+        print(f"Scheduled {len(plan)} of {len(queries)} searches:")
+        print('\n'.join(scheduler.describe(plan)))
+        known_ids = store.known_ids()
+    elif not terms:
+        parser.print_help()
+        return
+    else:
+        search_urls = [search_url(term) for term in terms]
 
-    print(f"Searching for: '{search_term}'")
-    print(f"URL: {search_url}")
-    print(f"Max pages: {max_pages}")
+    for term, url in zip(terms, search_urls):
+        print(f"Searching for: '{term}'")
+        print(f"URL: {url}")
+    if not scheduler:
+        print(f"Max pages: {max_pages}")
     print("-" * 50)
 
-    # Create scraper and run it
+    # Create scraper and run every search concurrently
     scraper = OLXScraper()
-    listings = scraper.scrape_search(search_url, max_pages=max_pages)
+    started_at = time.time()
+    results = scraper.scrape_many(search_urls, max_pages=max_pages)
 
-    if listings:
-        print(f"\n✅ Successfully scraped {len(listings)} listings!")
+    if scheduler:
+        # Store the listings, so the next run counts only the ones found after this one as new
+        run_id = scheduler.store.start_run(scheduler.active_since())
+        for url in search_urls:
+            scheduler.store.upsert_listings(results[url], run_id)
 
-        # Generate filenames based on search term
-        safe_filename = search_term.replace(' ', '_').replace('-', '_').lower()
-        json_file = f"olx_{safe_filename}.json"
-        csv_file = f"olx_{safe_filename}.csv"
+    for term, url in zip(terms, search_urls):
+        listings = results[url]
+        if scheduler and scraper.crawl_succeeded(url):
+            scheduler.record(url, sum(listing.listing_id not in known_ids for listing in listings), started_at)
+        if listings:
+            print(f"\n✅ Successfully scraped {len(listings)} listings for '{term}'!")
+            save_results(scraper, term, listings)
 
-        # Save with custom filenames
-        scraper.save_to_json(listings, json_file)
-        scraper.save_to_csv(listings, csv_file)
+            # Show sample
+            print("\n📋 Sample results:")
+            for i, listing in enumerate(listings[:5]):
+                print(f"{i+1}. {listing['title'][:50]}... - {listing['price']}")
+        else:
+            print(f"❌ No listings found for '{term}' or scraping failed")
 
-        print(f"📄 Saved to: {json_file} and {csv_file}")
+    if scheduler:
+        scheduler.store.close()
 
-        # Show sample
-        print("\n📋 Sample results:")
-        for i, listing in enumerate(listings[:5]):
-            print(f"{i+1}. {listing['title'][:50]}... - {listing['price']}")
-    else:
-        print("❌ No listings found or scraping failed")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,168 @@
+"""
+Freshness-aware query scheduler: which searches a run crawls, and how deep
+
+The searches come from a config file (queries.json): a term, a priority and a
+target freshness for each, plus the number of search page requests one run may
+spend. Every crawl records how many new listings each search produced, and the
+scheduler keeps a smoothed new-listings-per-hour rate per search in the database.
+
+A run first crawls the searches that are older than their target freshness, most
+overdue (times priority) first. The remaining budget goes to the searches most
+likely to have new listings since their last crawl, if that is likely enough. Each
+search gets about as many pages as its expected new listings fill. Hot searches are
+polled every run; cold ones wait until their target freshness runs out.
+"""
+
+import json
+import math
+import time
+from olx_scraper import search_url
+
+CONFIG_FILE = 'queries.json'
+
+# Listings on one search results page
+LISTINGS_PER_PAGE = 40
+
+# Searches within their target freshness are only crawled if at least this likely to have changed
+MIN_CHANGE_PROBABILITY = 0.5
+
+# Share of its target freshness after which a search is overdue: scheduled runs start a
+# few minutes early or late, so a search due every run must not just miss being overdue
+OVERDUE_AFTER = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS query_stats (
+    url TEXT PRIMARY KEY,
+    last_crawled REAL NOT NULL,
+    new_per_hour REAL,
+    crawls INTEGER NOT NULL
+);
+"""
+
+
+class Query:
+    """One configured search"""
+
+    __slots__ = ('term', 'url', 'priority', 'target_freshness', 'max_pages')
+
+    def __init__(self, term, priority=1.0, target_freshness_hours=24, max_pages=5, url=None):
+        self.term = term
+        self.url = url or search_url(term)
+        self.priority = priority
+        self.target_freshness = target_freshness_hours * 3600
+        self.max_pages = max_pages
+
+    def __repr__(self):
+        return f"Query({self.term!r}, priority {self.priority})"
+
+
+def load_queries(filename=CONFIG_FILE):
+    """Return (queries, request budget, default new listings per hour) from a config file"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    max_pages = config.get('max_pages', 5)
+    queries = [Query(**dict({'max_pages': max_pages}, **entry)) for entry in config['queries']]
+    return queries, config.get('request_budget', 15), config.get('default_new_per_hour', 1.0)
+
+
+class QueryScheduler:
+    """Plans each run's searches within a request budget, from rates learned in earlier runs
+
+    The rates live in the query_stats table of a ListingStore. `smoothing` is the
+    weight of the latest crawl in the rate (an exponentially weighted average).
+    """
+
+    def __init__(self, store, queries, budget=15, default_new_per_hour=1.0, smoothing=0.3):
+        self.store = store
+        self.queries = queries
+        self.budget = budget
+        self.default_new_per_hour = default_new_per_hour
+        self.smoothing = smoothing
+        with store.lock, store.conn:
+            store.conn.executescript(SCHEMA)
+
+    def stats(self):
+        """{search URL: (last crawled, new listings per hour or None, crawls)}"""
+        with self.store.lock:
+            rows = self.store.conn.execute("SELECT url, last_crawled, new_per_hour, crawls FROM query_stats").fetchall()
+        return {row['url']: (row['last_crawled'], row['new_per_hour'], row['crawls']) for row in rows}
+
+    def plan(self, now=None):
+        """Return [(query, pages)] for this run, at most `budget` pages in total, most urgent first"""
+        now = now or time.time()
+        stats = self.stats()
+        overdue = []
+        candidates = []
+        for query in self.queries:
+            if query.url not in stats:
+                # Never crawled: ranked as twice overdue, with every page new
+                overdue.append((query.priority * 2, query, query.max_pages))
+                continue
+            last_crawled, new_per_hour, _ = stats[query.url]
+            age = now - last_crawled
+            expected = (self.default_new_per_hour if new_per_hour is None else new_per_hour) * age / 3600
+            pages = min(query.max_pages, max(1, math.ceil(expected / LISTINGS_PER_PAGE)))
+            if age >= query.target_freshness * OVERDUE_AFTER:
+                overdue.append((query.priority * age / query.target_freshness, query, pages))
+            else:
+                # Poisson chance of at least one new listing since the last crawl
+                changed = 1 - math.exp(-expected)
+                if changed >= MIN_CHANGE_PROBABILITY:
+                    candidates.append((query.priority * changed, query, pages))
+
+        plan = []
+        remaining = self.budget
+        for _, query, pages in sorted(overdue, key=lambda e: -e[0]) + sorted(candidates, key=lambda e: -e[0]):
+            if remaining <= 0:
+                break
+            pages = min(pages, remaining)
+            plan.append((query, pages))
+            remaining -= pages
+        return plan
+
+    def active_since(self, now=None):
+        """Start of the window in which listings count as current for a run's exports
+
+        A run crawls only part of the searches; the others are crawled again within their
+        target freshness, so listings seen in twice the longest one stay in the exports.
+        """
+        now = now or time.time()
+        return now - 2 * max((query.target_freshness for query in self.queries), default=0)
+
+    def record(self, url, new_listings, crawled_at=None):
+        """Record a crawl of a search and the number of listings it found that were not stored before"""
+        crawled_at = crawled_at or time.time()
+        with self.store.lock, self.store.conn:
+            row = self.store.conn.execute(
+                "SELECT last_crawled, new_per_hour FROM query_stats WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                # A first crawl finds the search's whole backlog, which says nothing about its rate
+                self.store.conn.execute(
+                    "INSERT INTO query_stats (url, last_crawled, new_per_hour, crawls) VALUES (?, ?, NULL, 1)",
+                    (url, crawled_at)
+                )
+                return
+            hours = max(crawled_at - row['last_crawled'], 60) / 3600
+            observed = new_listings / hours
+            rate = observed if row['new_per_hour'] is None else (
+                self.smoothing * observed + (1 - self.smoothing) * row['new_per_hour']
+            )
+            self.store.conn.execute(
+                "UPDATE query_stats SET last_crawled = ?, new_per_hour = ?, crawls = crawls + 1 WHERE url = ?",
+                (crawled_at, rate, url)
+            )
+
+    def describe(self, plan):
+        """One line per planned search, for the run log"""
+        stats = self.stats()
+        lines = []
+        for query, pages in plan:
+            if query.url not in stats:
+                rate = 'first crawl'
+            elif stats[query.url][1] is None:
+                rate = 'rate not learned yet'
+            else:
+                rate = f"{stats[query.url][1]:.1f} new/hour"
+            lines.append(f"   {query.term}: {pages} page(s), priority {query.priority}, {rate}")
+        return lines
@@ -0,0 +1,219 @@
+"""
+SQLite storage for listings and filter verdicts
+
+The JSON/CSV files used by the website are exports generated from this database.
+Price history is kept in price_history.py.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from listing import Listing
+from listing_writers import JSONArrayWriter, CSVListingWriter, LISTING_FIELDS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    active_since REAL
+);
+
+CREATE TABLE IF NOT EXISTS listings (
+    listing_id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    price TEXT,
+    price_value REAL,
+    model TEXT,
+    location TEXT,
+    date TEXT,
+    link TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    last_run INTEGER,
+    position INTEGER,
+    kept INTEGER
+);
+CREATE INDEX IF NOT EXISTS listings_model ON listings (model);
+CREATE INDEX IF NOT EXISTS listings_price ON listings (price_value);
+CREATE INDEX IF NOT EXISTS listings_first_seen ON listings (first_seen);
+CREATE INDEX IF NOT EXISTS listings_last_seen ON listings (last_seen);
+CREATE INDEX IF NOT EXISTS listings_run ON listings (last_run, position);
+
+CREATE TABLE IF NOT EXISTS verdicts (
+    listing_id TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+def isoformat(timestamp):
+    """Format a UNIX timestamp as an ISO 8601 UTC string"""
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class ListingStore:
+    """Listings keyed by listing ID, upserted in batched transactions"""
+
+    def __init__(self, path='olx_data.db'):
+        self.path = path
+        # Queue workers in other processes may hold the write lock for a moment
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created (lock held)"""
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        if 'active_since' not in columns:
+            self.conn.execute("ALTER TABLE runs ADD COLUMN active_since REAL")
+
+    def close(self):
+        with self.lock:
+            self.conn.commit()
+            self.conn.close()
+
+    def start_run(self, active_since=None):
+        """Register a new scrape run and return its ID
+
+        An incremental run only re-visits part of the results, so it also counts
+        listings last seen after `active_since` as current.
+        """
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (started_at, active_since) VALUES (?, ?)", (time.time(), active_since)
+            )
+            return cursor.lastrowid
+
+    def latest_run(self):
+        """Return the ID of the most recent run, or None"""
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def upsert_listings(self, listings, run_id):
+        """Insert or update a batch of listings in one transaction, in crawl order"""
+        now = time.time()
+        rows = [
+            (listing.listing_id, listing.title, listing.price, listing.price_value, listing.model,
+             listing.location, listing.date, listing.link, now, now, run_id)
+            for listing in map(Listing.of, listings)
+        ]
+
+        with self.lock, self.conn:
+            # Take the write lock before reading the last position, so queue workers adding to the
+            # same run never reuse positions (an open transaction has it already, from its writes)
+            if not self.conn.in_transaction:
+                self.conn.execute("BEGIN IMMEDIATE")
+            position = self.conn.execute(
+                "SELECT COALESCE(MAX(position), -1) FROM listings WHERE last_run = ?", (run_id,)
+            ).fetchone()[0]
+            rows = [row + (position + offset,) for offset, row in enumerate(rows, 1)]
+            self.conn.executemany("""
+                INSERT INTO listings (listing_id, title, price, price_value, model, location, date, link,
+                                      first_seen, last_seen, last_run, position, kept)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)
+                ON CONFLICT (listing_id) DO UPDATE SET
+                    title = excluded.title, price = excluded.price, price_value = excluded.price_value,
+                    model = excluded.model, location = excluded.location, date = excluded.date,
+                    link = excluded.link, last_seen = excluded.last_seen,
+                    last_run = excluded.last_run, position = excluded.position, kept = NULL
+                WHERE listings.last_run IS NOT excluded.last_run
+            """, rows)
+
+    def mark_kept(self, verdicts):
+        """Record the filter outcome for a batch of (listing_id, kept) pairs"""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE listings SET kept = ? WHERE listing_id = ?",
+                [(int(kept), listing_id) for listing_id, kept in verdicts]
+            )
+
+    def known_ids(self):
+        """Return the set of every listing ID ever stored"""
+        with self.lock:
+            return {row[0] for row in self.conn.execute("SELECT listing_id FROM listings")}
+
+    def iter_run_listings(self, run_id, kept_only=False, fields=LISTING_FIELDS):
+        """Yield the current listings of a run as dicts of `fields` (columns of the listings table),
+        newest run first and in crawl order"""
+        query = f"""
+            SELECT {', '.join(fields)} FROM listings
+            WHERE (last_run = ? OR last_seen >= (SELECT active_since FROM runs WHERE run_id = ?))
+        """
+        if kept_only:
+            query += " AND kept = 1"
+        query += " ORDER BY last_run DESC, position"
+        with self.lock:
+            rows = self.conn.execute(query, (run_id, run_id)).fetchall()
+        for row in rows:
+            yield {field: row[field] for field in fields}
+
+    def export_listings(self, run_id, json_file='olx_listings.json', csv_file='olx_listings.csv'):
+        """Write the listings of a run to the JSON/CSV files the other tools read"""
+        with JSONArrayWriter(json_file) as json_out, CSVListingWriter(csv_file) as csv_out:
+            for listing in self.iter_run_listings(run_id):
+                json_out.write(listing)
+                csv_out.write(listing)
+
+    def export_defect_listings(self, run_id, csv_file='olx_defect_only.csv'):
+        """Write the kept listings of a run to the CSV the website reads"""
+        with CSVListingWriter(csv_file) as csv_out:
+            for listing in self.iter_run_listings(run_id, kept_only=True):
+                csv_out.write(listing)
+
+    def run_prices(self, run_id):
+        """Return (listing IDs, price strings, run start time) of the listings seen in a run"""
+        with self.lock:
+            started_at = self.conn.execute("SELECT started_at FROM runs WHERE run_id = ?", (run_id,)).fetchone()[0]
+            rows = self.conn.execute(
+                "SELECT listing_id, price FROM listings WHERE last_run = ? ORDER BY position", (run_id,)
+            ).fetchall()
+        return [row['listing_id'] for row in rows], [row['price'] or 'N/A' for row in rows], started_at
+
+
+class SQLiteVerdictStore:
+    """Filter verdicts by listing ID (the verdicts table of a ListingStore), valid while the fingerprint matches"""
+
+    def __init__(self, store, retention_days=30):
+        self.store = store
+        self.retention_days = retention_days
+        self.hits = 0
+
+    def get(self, listing_id, listing_fingerprint):
+        """Return the stored reason for a listing, or None if it is unknown or changed"""
+        with self.store.lock:
+            row = self.store.conn.execute(
+                "SELECT fingerprint, reason FROM verdicts WHERE listing_id = ?", (listing_id,)
+            ).fetchone()
+            if not row or row['fingerprint'] != listing_fingerprint:
+                return None
+            self.store.conn.execute(
+                "UPDATE verdicts SET last_seen = ? WHERE listing_id = ?", (time.time(), listing_id)
+            )
+            self.hits += 1
+            return row['reason']
+
+    def put(self, listing_id, listing_fingerprint, reason):
+        """Record the verdict reason for a listing"""
+        now = time.time()
+        with self.store.lock:
+            self.store.conn.execute("""
+                INSERT INTO verdicts (listing_id, fingerprint, reason, checked_at, last_seen)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (listing_id) DO UPDATE SET
+                    fingerprint = excluded.fingerprint, reason = excluded.reason,
+                    checked_at = excluded.checked_at, last_seen = excluded.last_seen
+            """, (listing_id, listing_fingerprint, reason, now, now))
+
+    def save(self):
+        """Commit pending verdicts, dropping listings not seen for retention_days"""
+        cutoff = time.time() - self.retention_days * 86400
+        with self.store.lock, self.store.conn:
+            self.store.conn.execute("DELETE FROM verdicts WHERE last_seen < ?", (cutoff,))
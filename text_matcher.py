@@ -0,0 +1,156 @@
+"""
+Multi-phrase matching for the filter rules, compiled once into a single regex
+
+Rules and text are normalized the same way (lowercase, no diacritics, hyphens and
+underscores count as spaces), so "fără defecte", "fara defecte" and "fara-defecte"
+are one rule.
+"""
+
+import re
+import unicodedata
+from types import MappingProxyType
+
+# Bumped whenever matching semantics change, so stored verdicts are re-evaluated
+MATCHER_VERSION = 2
+
+# Separators inside a phrase: any run of whitespace, hyphens or underscores
+_SEPARATOR = r'[\s\-_]+'
+
+# Distinct combinations of matched phrases whose results are kept for reuse
+MAX_CACHED_RESULTS = 4096
+
+
+def normalize_text(text):
+    """Lowercase and reduce to ASCII: diacritics are stripped ("ă" -> "a", "ș" -> "s")
+
+    Characters without an ASCII base letter (emoji, currency signs, ...) are dropped,
+    since no rule can contain them.
+    """
+    text = text.lower()
+    if text.isascii():
+        return text
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+
+
+def normalize_phrase(phrase):
+    """Normalize a rule phrase, writing every separator as a single space"""
+    return ' '.join(re.split(_SEPARATOR, normalize_text(phrase).strip()))
+
+
+def _trie_regex(phrases):
+    """Build a regex matching any of the phrases, sharing common prefixes like a trie
+
+    Optional branches are greedy, so at a given position the longest phrase wins.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [
+            (_SEPARATOR if char == ' ' else re.escape(char)) + build(child)
+            for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            pattern = '(?:' + pattern + ')?'
+        return pattern
+
+    return build(trie) if trie else '(?!)'
+
+
+class RuleMatcher:
+    """Finds the phrases of several named rule groups in one pass over the text
+
+    Every phrase is compiled into one trie-shaped regex. Searching again one character
+    after each match start finds the longest phrase starting at every position, and
+    shorter phrases that are prefixes of it are added from a precomputed table, so
+    overlapping matches are all returned.
+
+    match() results are read-only ({group: tuple of phrases}) and shared between
+    texts that contain the same phrases.
+    """
+
+    def __init__(self, groups):
+        # Normalized phrase -> [(group, original phrase, rank within group)]
+        self.rules = {}
+        for group, phrases in groups.items():
+            for rank, phrase in enumerate(phrases):
+                self.rules.setdefault(normalize_phrase(phrase), []).append((group, phrase, rank))
+        self.groups = list(groups)
+
+        self._search = re.compile(_trie_regex(self.rules)).search
+        self._prefixes = {
+            rule: [other for other in self.rules if other != rule and rule.startswith(other)]
+            for rule in self.rules
+        }
+        # Matched text -> every (group, rank, phrase) it implies, including prefix rules
+        self._hits = {}
+        # Set of matched texts -> match() result
+        self._results = {}
+        self._no_match = MappingProxyType({group: () for group in self.groups})
+
+    def _scan(self, text):
+        """Yield the longest phrase (as written in the text) starting at each position where one starts"""
+        found = self._search(text)
+        while found is not None:
+            yield found
+            found = self._search(text, found.start() + 1)
+
+    def find_all(self, text):
+        """Return (position, normalized phrase) for every occurrence, in text order"""
+        if not text:
+            return []
+        matches = []
+        for found in self._scan(normalize_text(text)):
+            rule = found.group()
+            if rule not in self._prefixes:
+                rule = ' '.join(re.split(_SEPARATOR, rule))
+            matches.append((found.start(), rule))
+            matches.extend((found.start(), other) for other in self._prefixes[rule])
+        return matches
+
+    def _hits_for(self, matched):
+        """Return the (group, rank, phrase) entries implied by a matched piece of text"""
+        hits = self._hits.get(matched)
+        if hits is None:
+            rule = matched if matched in self._prefixes else ' '.join(re.split(_SEPARATOR, matched))
+            hits = [
+                (group, rank, phrase)
+                for hit in [rule] + self._prefixes[rule]
+                for group, phrase, rank in self.rules[hit]
+            ]
+            self._hits[matched] = hits
+        return hits
+
+    def match(self, text):
+        """Return a read-only {group: (original phrases found, in rule order)} for every group"""
+        if not text:
+            return self._no_match
+        text = normalize_text(text)
+        found = self._search(text)
+        if found is None:
+            return self._no_match
+        # The _scan() loop, inlined: this runs for every title, link and description
+        matched = set()
+        while found is not None:
+            matched.add(found.group())
+            found = self._search(text, found.start() + 1)
+        matched = frozenset(matched)
+        result = self._results.get(matched)
+        if result is None:
+            found = {group: set() for group in self.groups}
+            for text_matched in matched:
+                for group, rank, phrase in self._hits_for(text_matched):
+                    found[group].add((rank, phrase))
+            result = MappingProxyType({
+                group: tuple(phrase for _, phrase in sorted(matches)) for group, matches in found.items()
+            })
+            if len(self._results) < MAX_CACHED_RESULTS:
+                self._results[matched] = result
+        return result
@@ -0,0 +1,146 @@
+"""
+Shared HTTP transport for the scraper and the filter
+
+One requests.Session whose connection pool is sized to the number of concurrent
+requests, so keep-alive connections (and their DNS lookups and TLS handshakes) are
+reused by every fetching thread and by both stages when they share a Transport.
+Responses are requested compressed: gzip/deflate, and brotli when the `brotli` (or
+`brotlicffi`) package is installed. fetch() holds the retry loop both stages use and
+records per-request latency and bytes: on the wire (compressed, from
+response.raw.tell()) and decoded.
+"""
+
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) '
+              'Chrome/91.0.4472.124 Safari/537.36')
+
+try:
+    import brotli  # noqa: F401  (urllib3 decodes 'br' responses when it is installed)
+    HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        HAS_BROTLI = True
+    except ImportError:
+        HAS_BROTLI = False
+
+ACCEPT_ENCODING = 'gzip, deflate, br' if HAS_BROTLI else 'gzip, deflate'
+
+
+class Transport:
+    """Pooled, compression-negotiating HTTP session with byte and latency accounting
+
+    `pool_size` is the number of keep-alive connections kept per host; give it at
+    least the number of requests in flight at once, or connections beyond it are
+    closed after each request.
+    """
+
+    def __init__(self, pool_size=10, timeout=10, metrics=None):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.metrics = metrics
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers.update({
+            # Set a user agent to avoid being blocked
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
+        })
+        self.lock = threading.Lock()
+        self.totals = {'requests': 0, 'wire_bytes': 0, 'decoded_bytes': 0, 'seconds': 0.0}
+
+    def get(self, url, stage='other', metrics=None, **kwargs):
+        """GET a URL, recording its latency and bytes; returns the requests.Response"""
+        kwargs.setdefault('timeout', self.timeout)
+        start = time.perf_counter()
+        response = self.session.get(url, **kwargs)
+        elapsed = time.perf_counter() - start
+        # The body has been read: raw.tell() is what came over the wire, before decompression
+        wire_bytes = response.raw.tell() if response.raw is not None else len(response.content)
+        decoded_bytes = len(response.content)
+        with self.lock:
+            self.totals['requests'] += 1
+            self.totals['wire_bytes'] += wire_bytes
+            self.totals['decoded_bytes'] += decoded_bytes
+            self.totals['seconds'] += elapsed
+        metrics = metrics or self.metrics
+        if metrics is not None:
+            metrics.observe('request_seconds', elapsed, stage=stage)
+            metrics.count('wire_bytes', wire_bytes, stage=stage)
+            metrics.count('response_bytes', decoded_bytes, stage=stage)
+            metrics.count('responses', stage=stage, encoding=response.headers.get('Content-Encoding', 'identity'))
+        return response
+
+    def fetch(self, url, stage, rate_limiter, metrics, cache=None, max_retries=3, paced=False):
+        """Return a page's text, retrying failed requests; raises the last requests.RequestException
+
+        Every attempt waits for `rate_limiter`, except the first with paced=True (the
+        caller already waited). Through `cache` (an HTTPCache), fresh pages cost no
+        request and stale ones a conditional one.
+        """
+        if cache:
+            cached = cache.get_fresh(url)
+            if cached is not None:
+                metrics.count('fetches', stage=stage, result='cached')
+                return cached
+
+        session = _StageSession(self, stage, metrics)
+        for attempt in range(max_retries):
+            if attempt or not paced:
+                rate_limiter.wait()
+            try:
+                start = time.perf_counter()
+                if cache:
+                    html_content = cache.fetch(session, url, timeout=self.timeout)
+                else:
+                    response = session.get(url)
+                    response.raise_for_status()
+                    html_content = response.text
+                latency = time.perf_counter() - start
+                rate_limiter.record_success(latency)
+                metrics.observe('fetch_seconds', latency, stage=stage)
+                metrics.count('fetches', stage=stage, result='ok')
+                return html_content
+            except requests.RequestException as e:
+                print(f"Attempt {attempt + 1} failed for {url}: {e}")
+                rate_limiter.record_error(e)
+                metrics.count('fetches', stage=stage, result='error')
+                if attempt < max_retries - 1:
+                    metrics.count('retries', stage=stage)
+                else:
+                    raise
+
+    def connections_opened(self):
+        """Connections opened so far, over every host (fewer than requests when keep-alive works)"""
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def summary(self):
+        with self.lock:
+            totals = dict(self.totals)
+        saved = 1 - totals['wire_bytes'] / totals['decoded_bytes'] if totals['decoded_bytes'] else 0
+        return (f"{totals['requests']} requests over {self.connections_opened()} connections, "
+                f"{totals['wire_bytes'] // 1024} KB on the wire for {totals['decoded_bytes'] // 1024} KB of pages "
+                f"({saved:.0%} saved by compression), {totals['seconds']:.1f}s in requests")
+
+    def close(self):
+        self.session.close()
+
+
+class _StageSession:
+    """Transport.get with a fixed stage label, usable where a requests.Session is expected (HTTPCache.fetch)"""
+
+    def __init__(self, transport, stage, metrics=None):
+        self.transport = transport
+        self.stage = stage
+        self.metrics = metrics
+
+    def get(self, url, **kwargs):
+        return self.transport.get(url, self.stage, self.metrics, **kwargs)
@@ -0,0 +1,15 @@
+"""
+Fingerprints for persisted filter verdicts, so unchanged listings are not re-checked every run
+
+The verdicts themselves are stored in the verdicts table of the listing database
+(storage.SQLiteVerdictStore).
+"""
+
+import hashlib
+import json
+
+
+def fingerprint(*parts):
+    """Return a short stable hash of the given values"""
+    data = json.dumps(parts, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()[:16]
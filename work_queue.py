@@ -0,0 +1,185 @@
+"""
+SQLite work queue shared by crawl worker processes, on one machine or several
+
+Tasks live in named queues ('search' for one results page of a query, 'detail' for
+one listing page) and are unique by key, so two workers that find the same listing
+add one task. A worker leases tasks for `lease_seconds`; a task whose lease runs out
+(the worker crashed or hung) is handed to the next worker that asks, up to
+`max_attempts` leases, after which it is marked failed.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (queue, key)
+);
+CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (queue, state, task_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Task states
+PENDING, LEASED, DONE, FAILED = 'pending', 'leased', 'done', 'failed'
+
+
+def worker_name():
+    """Lease owner name of this process, unique across machines"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Task:
+    """One leased task"""
+
+    __slots__ = ('task_id', 'queue', 'key', 'payload', 'attempts')
+
+    def __init__(self, task_id, queue, key, payload, attempts):
+        self.task_id = task_id
+        self.queue = queue
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Task({self.queue!r}, {self.key!r}, attempt {self.attempts})"
+
+
+class WorkQueue:
+    """Tasks with leases, retries and completion tracking in one SQLite file
+
+    Every process opens its own WorkQueue on the same path. wal=True suits workers on
+    one machine; workers on several machines share the file over a network filesystem
+    with working locks and need wal=False (WAL needs shared memory on one host).
+    """
+
+    def __init__(self, path='work_queue.db', lease_seconds=300, max_attempts=3, wal=True, owner=None):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.owner = owner or worker_name()
+        # Autocommit: every write below is its own explicit transaction
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def put_many(self, queue, items):
+        """Add (key, payload) tasks to a queue, skipping keys it already holds; returns how many were added"""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (queue, key, payload, updated_at) VALUES (?, ?, ?, ?)",
+                [(queue, key, json.dumps(payload), now) for key, payload in items]
+            )
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return cursor.rowcount
+
+    def put(self, queue, key, payload):
+        """Add one task; returns False if the queue already holds the key"""
+        return self.put_many(queue, [(key, payload)]) == 1
+
+    def lease(self, queue, limit=1):
+        """Lease up to `limit` pending tasks (or tasks whose lease expired), oldest first"""
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock, so two workers never lease the same task
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that used up their attempts will not be retried
+            self.conn.execute("""
+                UPDATE tasks SET state = ?, error = 'lease expired', lease_owner = NULL, updated_at = ?
+                WHERE queue = ? AND state = ? AND lease_expires < ? AND attempts >= ?
+            """, (FAILED, now, queue, LEASED, now, self.max_attempts))
+            rows = self.conn.execute("""
+                SELECT task_id, key, payload, attempts FROM tasks
+                WHERE queue = ? AND (state = ? OR (state = ? AND lease_expires < ?))
+                ORDER BY task_id LIMIT ?
+            """, (queue, PENDING, LEASED, now, limit)).fetchall()
+            self.conn.executemany("""
+                UPDATE tasks SET state = ?, attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated_at = ?
+                WHERE task_id = ?
+            """, [(LEASED, self.owner, now + self.lease_seconds, now, row['task_id']) for row in rows])
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        return [
+            Task(row['task_id'], queue, row['key'], json.loads(row['payload']), row['attempts'] + 1)
+            for row in rows
+        ]
+
+    def _finish(self, task, state, result=None, error=None):
+        cursor = self.conn.execute("""
+            UPDATE tasks SET state = ?, result = ?, error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ?
+            WHERE task_id = ? AND state = ? AND lease_owner = ?
+        """, (state, json.dumps(result), error, time.time(), task.task_id, LEASED, self.owner))
+        return cursor.rowcount == 1
+
+    def complete(self, task, result=None):
+        """Mark a leased task done; returns False if the lease was lost (the task went to another worker)"""
+        return self._finish(task, DONE, result)
+
+    def fail(self, task, error):
+        """Give a task back for a retry, or mark it failed after max_attempts"""
+        state = FAILED if task.attempts >= self.max_attempts else PENDING
+        return self._finish(task, state, error=str(error))
+
+    def renew(self, task):
+        """Extend the lease of a task that is taking long"""
+        cursor = self.conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND state = ? AND lease_owner = ?",
+            (time.time() + self.lease_seconds, task.task_id, LEASED, self.owner)
+        )
+        return cursor.rowcount == 1
+
+    def counts(self):
+        """{queue: {state: number of tasks}}"""
+        counts = {}
+        for row in self.conn.execute("SELECT queue, state, COUNT(*) AS n FROM tasks GROUP BY queue, state"):
+            counts.setdefault(row['queue'], {})[row['state']] = row['n']
+        return counts
+
+    def unfinished(self):
+        """Number of tasks still pending or leased, in any queue"""
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE state IN (?, ?)", (PENDING, LEASED)
+        ).fetchone()[0]
+
+    def reset(self):
+        """Drop every task and setting, for a new crawl"""
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.execute("DELETE FROM tasks")
+        self.conn.execute("DELETE FROM meta")
+        self.conn.execute("COMMIT")
+
+    def set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, json.dumps(value)))
+
+    def get_meta(self, name, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return default if row is None else json.loads(row['value'])